@@ -9,16 +9,32 @@ bl_info = {
 }
 
 import bpy
-from bpy.props import (CollectionProperty, FloatProperty, StringProperty, IntProperty, PointerProperty, BoolProperty, EnumProperty)
+from bpy.props import (CollectionProperty, FloatProperty, StringProperty, IntProperty, PointerProperty, BoolProperty, EnumProperty, BoolVectorProperty)
 from bpy.types import PropertyGroup, UIList, Operator, Panel
 from bpy_extras.io_utils import ExportHelper
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
+import bisect
+import operator
+import re
+import csv
+import functools
+import hashlib
+import heapq
+import io
 import math
 import json
 import os
+import shutil
+import sqlite3
+import subprocess
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 
 SAW_KERF = 4.0  # mm Schnittverlust pro Schnitt
+ESTIMATE_DEBOUNCE = 0.4  # s Ruhezeit nach der letzten Änderung, bevor die Schätzung neu rechnet
 
 def get_lang(context):
     try:
@@ -26,66 +42,1937 @@ def get_lang(context):
     except Exception:
         return 'de'
 
+# Übersetzungen: Quelltexte sind deutsch, pro Sprache nur die abweichenden Texte.
+# Wird einmal beim Laden aufgebaut; t() ist danach nur noch ein Dict-Zugriff.
+TRANSLATIONS = {
+    "de": {},
+    "en": {
+        "Platten Konfiguration": "Panel Configuration",
+        "Kommentar": "Comment",
+        "Ausrichtung": "Orientation",
+        "Längs": "Longitudinal",
+        "Quer": "Crosswise",
+        "Material für Platte erzeugen": "Create sheet material",
+        "Cutlist als XLSX exportieren": "Export cutlist as XLSX",
+        "Cutlist als PDF exportieren": "Export cutlist as PDF",
+        "Preset speichern": "Save preset",
+        "Preset laden": "Load preset",
+        "Presetname": "Preset name",
+        "Schnittbild (Nesting)": "Cutting diagram (Nesting)",
+        "Schriftgröße": "Font Size",
+        "Plattenbedarf (Schätzung)": "Sheet demand (estimate)",
+        "Platten": "sheets",
+        "wird berechnet …": "calculating …",
+        "Mindestmaß Reststück (mm)": "Minimum offcut size (mm)",
+        "Reststück einlagern": "Store offcut",
+        "Preis pro Platte": "Price per sheet",
+        "Beliebig": "Any",
+        "Teiletabelle beim Speichern schreiben": "Write part table on save",
+        "Etiketten als PDF exportieren": "Export labels as PDF",
+        "Änderungen als XLSX exportieren": "Export changes as XLSX",
+        "Für Maschine/ERP exportieren": "Export for machine/ERP",
+        "Schriftdatei": "Font file",
+        "Materialien nach Dicke zuweisen": "Assign materials by thickness",
+        "Varianten als XLSX exportieren": "Export variants as XLSX",
+        "Teil": "Part",
+        "Faser fix": "Lock grain",
+        "Priorität": "Priority",
+        "Für Auswahl setzen": "Set for selection",
+        "Auf Auswahl übertragen": "Copy to selection",
+        "Auswahlregeln": "Inclusion rules",
+        "Optimierung als Job": "Optimize as job",
+        "Teile geändert, Job neu starten": "Parts changed, restart job",
+        "fertig": "done",
+        "Sprache": "Language",
+        "Plattenname": "Sheet name",
+        "Ohne Faserrichtung, Teile dürfen gedreht werden": "No grain direction, parts may be rotated",
+    },
+}
+
+# Blender-Locales je Sprache für bpy.app.translations (Operator- und Property-Namen).
+# Das Panel übersetzt selbst über t() und zeichnet mit translate=False; die
+# Einträge der dynamischen Enums bleiben ganz draußen, sonst übersetzt Blender
+# sie ein zweites Mal und cutlist_lang = 'de' zeigt doch Englisch.
+BLENDER_LOCALES = {"en": ("en_US", "en_GB")}
+NUR_T = frozenset(("Längs", "Quer", "Beliebig", "Ohne Faserrichtung, Teile dürfen gedreht werden"))
+
 def t(label, context=None):
-    tr = {
-        "de": {
-            "Platten Konfiguration": "Platten Konfiguration",
-            "Kommentar": "Kommentar",
-            "Ausrichtung": "Ausrichtung",
-            "Längs": "Längs",
-            "Quer": "Quer",
-            "Material für Platte erzeugen": "Material für Platte erzeugen",
-            "Cutlist als XLSX exportieren": "Cutlist als XLSX exportieren",
-            "Cutlist als PDF exportieren": "Cutlist als PDF exportieren",
-            "Preset speichern": "Preset speichern",
-            "Preset laden": "Preset laden",
-            "Presetname": "Presetname",
-            "Schnittbild (Nesting)": "Schnittbild (Nesting)",
-            "Schriftgröße": "Schriftgröße",
-        },
-        "en": {
-            "Platten Konfiguration": "Panel Configuration",
-            "Kommentar": "Comment",
-            "Ausrichtung": "Orientation",
-            "Längs": "Longitudinal",
-            "Quer": "Crosswise",
-            "Material für Platte erzeugen": "Create sheet material",
-            "Cutlist als XLSX exportieren": "Export cutlist as XLSX",
-            "Cutlist als PDF exportieren": "Export cutlist as PDF",
-            "Preset speichern": "Save preset",
-            "Preset laden": "Load preset",
-            "Presetname": "Preset name",
-            "Schnittbild (Nesting)": "Cutting diagram (Nesting)",
-            "Schriftgröße": "Font Size",
-        }
+    lang = get_lang(context) if context else 'de'
+    return TRANSLATIONS.get(lang, TRANSLATIONS['de']).get(label, label)
+
+def blender_translations():
+    katalog = {}
+    for lang, locales in BLENDER_LOCALES.items():
+        eintraege = {}
+        for quelle, ziel in TRANSLATIONS[lang].items():
+            if quelle in NUR_T:
+                continue
+            eintraege[("*", quelle)] = ziel
+            eintraege[("Operator", quelle)] = ziel
+        for locale in locales:
+            katalog[locale] = eintraege
+    return katalog
+
+def plate_material_name(plate):
+    return f"{plate.name}_{int(plate.thickness)}mm_{int(plate.length)}x{int(plate.width)}"
+
+def teile_pro_platte(plate, teil_l, teil_b):
+    # Nur Orientierung – nicht drehen! (außer bei "Beliebig")
+    if plate.orientation == "ANY":
+        return max(teile_pro_platte_orientiert(plate, teil_l, teil_b, "LONG"),
+                   teile_pro_platte_orientiert(plate, teil_l, teil_b, "CROSS"))
+    return teile_pro_platte_orientiert(plate, teil_l, teil_b, plate.orientation)
+
+def teile_pro_platte_orientiert(plate, teil_l, teil_b, orientation):
+    if orientation == "CROSS":
+        n_l = int((plate.length + SAW_KERF) // (teil_b + SAW_KERF))
+        n_b = int((plate.width + SAW_KERF) // (teil_l + SAW_KERF))
+    else:  # LONG
+        n_l = int((plate.length + SAW_KERF) // (teil_l + SAW_KERF))
+        n_b = int((plate.width + SAW_KERF) // (teil_b + SAW_KERF))
+    return max(n_l * n_b, 1)
+
+def measure_object(obj):
+    dims = sorted([obj.dimensions.x, obj.dimensions.y, obj.dimensions.z], reverse=True)
+    mat_name = obj.active_material.name if getattr(obj, "active_material", None) else ""
+    return round(dims[0],2), round(dims[1],2), round(dims[2],2), mat_name
+
+# Teileigenschaften je Objekt (obj.cutlist, siehe CutlistPartProps):
+# (Kommentar, Ausrichtung, Faser fix, Kanten L1/L2/B1/B2, Priorität)
+PART_DEFAULTS = ("", "LONG", False, (False, False, False, False), 0)
+_read_part_props = operator.attrgetter(
+    "cutlist.comment", "cutlist.orientation", "cutlist.grain_lock", "cutlist.edge_banding", "cutlist.priority"
+)
+
+def part_props(obj):
+    if isinstance(obj, InstancePart):
+        return obj.props
+    try:
+        comment, orientation, grain_lock, kanten, priority = _read_part_props(obj)
+    except AttributeError:
+        return PART_DEFAULTS
+    return (comment, orientation, grain_lock, tuple(kanten), priority)
+
+def read_part_props(objects):
+    return [part_props(obj) for obj in objects]
+
+def edge_label(kanten):
+    return " ".join(name for name, an in zip(("L1", "L2", "B1", "B2"), kanten) if an) or "-"
+
+# --- Auswahlregeln -------------------------------------------------------------
+# Die Regeln aus PlateSettings.rules werden pro Export einmal in ein Prädikat
+# übersetzt: Collections als Menge ihrer Objekte, Regex vorkompiliert.
+# Ein Objekt muss (falls vorhanden) eine Einschluss-Regel erfüllen und darf
+# keine Ausschluss-Regel erfüllen. Collection-Instanzen werden als Ganzes geprüft.
+
+@functools.lru_cache(maxsize=256)
+def rule_regex(pattern):
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+def _prop_matches(name, wert):
+    try:
+        zahl = float(wert)
+    except ValueError:
+        zahl = None
+
+    def pruefen(obj):
+        vorhanden = obj.get(name)
+        if vorhanden is None:
+            return False
+        if zahl is not None and isinstance(vorhanden, (int, float)):
+            return vorhanden == zahl
+        return str(vorhanden) == wert
+    return pruefen
+
+def compile_rules(rules):
+    # -> Prädikat obj -> bool, oder None wenn keine Regel aktiv ist
+    einschluss, ausschluss = [], []
+    for rule in rules:
+        if not rule.enabled:
+            continue
+        if rule.kind == 'COLLECTION':
+            if rule.collection is None:
+                continue
+            mitglieder = set(rule.collection.all_objects)
+            test = mitglieder.__contains__
+        elif rule.kind == 'PROPERTY':
+            if not rule.prop_name:
+                continue
+            test = _prop_matches(rule.prop_name, rule.prop_value)
+        else:
+            regex = rule_regex(rule.pattern)
+            if regex is None:
+                # ungültige Ausdrücke markiert die Regelliste, hier nur überspringen
+                continue
+            test = lambda obj, suche=regex.search: suche(obj.name) is not None
+        (einschluss if rule.action == 'INCLUDE' else ausschluss).append(test)
+    if not einschluss and not ausschluss:
+        return None
+
+    def regel(obj):
+        if einschluss and not any(test(obj) for test in einschluss):
+            return False
+        return not any(test(obj) for test in ausschluss)
+    return regel
+
+def filter_objects(objects, export_sketch=False, regel=None, expand_instances=True):
+    # Collection-Instanzen werden zu ihren Teilen aufgelöst; Aufrufer, die in die
+    # Objekte schreiben, schalten das mit expand_instances=False ab
+    teile = []
+    for o in objects:
+        if regel is not None and o.type in {'MESH', 'EMPTY'} and not regel(o):
+            continue
+        if o.type == 'MESH':
+            teile.append(o)
+        elif (expand_instances and o.type == 'EMPTY' and o.instance_type == 'COLLECTION'
+              and o.instance_collection is not None):
+            teile.extend(expand_instance(o))
+    objects = teile
+    if not export_sketch:
+        objects = [o for o in objects if "sketch" not in o.name.lower()]
+    return objects
+
+def collect_objects(context, export_all=True, export_sketch=False, expand_instances=True):
+    regel = compile_rules(context.scene.plate_settings.rules)
+    return filter_objects(context.scene.objects if export_all else context.selected_objects,
+                          export_sketch, regel, expand_instances)
+
+def part_group_key(gemessen, props):
+    # gemessen: measure_object(obj); abweichende Ausrichtung, Kanten usw. ergeben eine eigene Zeile
+    if props[1:] != PART_DEFAULTS[1:]:
+        return tuple(gemessen) + props[1:]
+    return tuple(gemessen)
+
+def group_parts(objects, messungen=None):
+    # gleiche Maße + Material -> eine Zeile mit Stückzahl
+    # messungen: optionaler Cache obj -> measure_object(obj), über mehrere Aufrufe geteilt
+    parts_grouped = {}
+    for obj, props in zip(objects, read_part_props(objects)):
+        if messungen is None:
+            laenge, breite, dicke, mat_name = measure_object(obj)
+        else:
+            gemessen = messungen.get(obj)
+            if gemessen is None:
+                gemessen = messungen[obj] = measure_object(obj)
+            laenge, breite, dicke, mat_name = gemessen
+        key = part_group_key((laenge, breite, dicke, mat_name), props)
+        if key not in parts_grouped:
+            col_name = obj.users_collection[0].name if getattr(obj, "users_collection", []) else 'None'
+            parts_grouped[key] = {
+                "name": obj.name,
+                "laenge": laenge,
+                "breite": breite,
+                "dicke": dicke,
+                "col_name": col_name,
+                "mat_name": mat_name,
+                "stueckzahl": 1,
+                "comment": props[0],
+                "orientation": props[1],
+                "grain_lock": props[2],
+                "kanten": props[3],
+                "priority": props[4],
+            }
+        else:
+            parts_grouped[key]["stueckzahl"] += 1
+    return parts_grouped
+
+# --- Collection-Instanzen und verlinkte Bibliotheken ------------------------
+# Eine Collection wird einmal in eine Teiletabelle zerlegt: pro Mesh die
+# Matrix relativ zum Instanz-Ursprung und die Größe der lokalen Bounding-Box.
+# Instanzen werden dann nur noch über ihre Matrix aufgelöst (Maß = Länge der
+# Matrixspalte × Box). Tabellen aus Bibliotheken bleiben gültig, solange sich
+# Pfad und Änderungszeit aller beteiligten .blend-Dateien nicht ändern.
+
+_library_cache = {}  # (Bibliothekspfad, Collection-Name) -> {"deps": {pfad: mtime}, "tabelle": (...)}
+
+class InstancePart:
+    # verhält sich für measure_object/group_parts wie ein Mesh-Objekt
+    __slots__ = ("name", "type", "dimensions", "active_material", "users_collection", "props")
+
+    def __init__(self, name, dims, mat, collection, props):
+        self.name = name
+        self.type = 'MESH'
+        self.dimensions = dims
+        self.active_material = mat
+        self.users_collection = collection
+        self.props = props
+
+class _Dims:
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x, y, z):
+        self.x, self.y, self.z = x, y, z
+
+class _Named:
+    # Materialname statt Referenz, damit der Cache keine bpy-Daten festhält
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+def library_path(library):
+    return os.path.normpath(bpy.path.abspath(library.filepath))
+
+def _mtime(pfad):
+    try:
+        return os.path.getmtime(pfad)
+    except OSError:
+        return None
+
+def _collection_table(coll, deps):
+    namen, materialien, matrizen, boxen, props = [], [], [], [], []
+    offset = np.eye(4)
+    offset[:3, 3] = [-v for v in coll.instance_offset]
+    for obj in coll.all_objects:
+        welt = offset @ np.array(obj.matrix_world)
+        if obj.type == 'MESH':
+            ecken = np.array([tuple(c) for c in obj.bound_box])
+            namen.append(obj.name)
+            materialien.append(obj.active_material.name if obj.active_material else "")
+            matrizen.append(welt)
+            boxen.append(ecken.max(axis=0) - ecken.min(axis=0))
+            props.append(part_props(obj))
+        elif obj.type == 'EMPTY' and obj.instance_type == 'COLLECTION' and obj.instance_collection is not None:
+            sub_namen, sub_mats, sub_matrizen, sub_boxen, sub_props = instance_table(obj.instance_collection, deps)
+            namen.extend(f"{obj.name}/{n}" for n in sub_namen)
+            materialien.extend(sub_mats)
+            matrizen.extend(welt @ sub_matrizen)
+            boxen.extend(sub_boxen)
+            props.extend(sub_props)
+    return (namen, materialien,
+            np.array(matrizen).reshape(-1, 4, 4), np.array(boxen).reshape(-1, 3), props)
+
+def instance_table(coll, deps):
+    if coll.library is None:
+        return _collection_table(coll, deps)
+    pfad = library_path(coll.library)
+    key = (pfad, coll.name)
+    eintrag = _library_cache.get(key)
+    if eintrag is None or any(_mtime(p) != m for p, m in eintrag["deps"].items()):
+        eigene = {pfad: _mtime(pfad)}
+        eintrag = _library_cache[key] = {"deps": eigene, "tabelle": _collection_table(coll, eigene)}
+    deps.update(eintrag["deps"])
+    return eintrag["tabelle"]
+
+def expand_instance(inst):
+    namen, materialien, matrizen, boxen, props = instance_table(inst.instance_collection, {})
+    if not namen:
+        return []
+    welt = np.array(inst.matrix_world) @ matrizen
+    dims = np.linalg.norm(welt[:, :3, :3], axis=1) * boxen
+    collection = inst.users_collection[:1]
+    return [InstancePart(f"{inst.name}/{name}", _Dims(*d), _Named(mat) if mat else None, collection, prop)
+            for name, mat, d, prop in zip(namen, materialien, dims.tolist(), props)]
+
+# --- Live-Schätzung des Plattenbedarfs -------------------------------------
+# Der Depsgraph-Handler merkt sich nur geänderte Objekte; ein entprellter Timer
+# misst diese nach und pflegt pro Material die Teilegruppen inkrementell.
+# draw() liest ausschließlich _sheet_estimates.
+
+_part_cache = {}        # session_uid -> [(laenge, breite, mat_name)], mehrere bei Collection-Instanzen
+_material_groups = {}   # mat_name -> {(laenge, breite): stueckzahl}
+_material_area = {}     # mat_name -> Teilefläche in mm²
+_dirty_parts = {}       # session_uid -> Objektname
+_sheet_estimates = {}   # (mat_name, länge, breite, orientation) -> (untergrenze, obergrenze)
+_estimate_state = {"scene": None, "objects": 0, "rules": None, "full": True, "last_change": 0.0}
+
+def _estimate_remove(uid):
+    for laenge, breite, mat_name in _part_cache.pop(uid, ()):
+        groups = _material_groups.get(mat_name)
+        if groups is not None:
+            groups[(laenge, breite)] -= 1
+            if groups[(laenge, breite)] <= 0:
+                del groups[(laenge, breite)]
+        _material_area[mat_name] = _material_area.get(mat_name, 0.0) - laenge * breite
+
+def _estimate_add(uid, obj, regel):
+    # dieselben Filter wie der XLSX-Export: Sketch, Auswahlregeln, Collection-Instanzen
+    teile = []
+    for teil in filter_objects((obj,), False, regel):
+        laenge, breite, _dicke, mat_name = measure_object(teil)
+        teile.append((laenge, breite, mat_name))
+        groups = _material_groups.setdefault(mat_name, {})
+        groups[(laenge, breite)] = groups.get((laenge, breite), 0) + 1
+        _material_area[mat_name] = _material_area.get(mat_name, 0.0) + laenge * breite
+    if teile:
+        _part_cache[uid] = teile
+
+def _rules_signature(rules):
+    return tuple((r.enabled, r.action, r.kind, r.collection.name if r.collection else "", r.prop_name, r.prop_value, r.pattern)
+                 for r in rules)
+
+def estimate_sheets(plate):
+    mat_name = plate_material_name(plate)
+    groups = _material_groups.get(mat_name)
+    if not groups:
+        return 0, 0
+    untergrenze = math.ceil(_material_area.get(mat_name, 0.0) / (plate.length * plate.width) - 1e-9)
+    obergrenze = 0
+    for (laenge, breite), qty in groups.items():
+        obergrenze += math.ceil(qty / teile_pro_platte(plate, laenge, breite))
+    return untergrenze, max(obergrenze, untergrenze)
+
+def _estimate_key(plate):
+    return (plate_material_name(plate), plate.length, plate.width, plate.orientation)
+
+def _estimate_stale(scene):
+    # Objekte entfernt/verlinkt oder Material umbenannt -> Teilegruppen passen nicht mehr
+    if _estimate_state["full"] or _estimate_state["scene"] != scene.name:
+        return True
+    if len(scene.objects) != _estimate_state["objects"]:
+        return True
+    if _rules_signature(scene.plate_settings.rules) != _estimate_state["rules"]:
+        return True
+    return any(mat_name and mat_name not in bpy.data.materials for mat_name in _material_groups)
+
+def update_sheet_estimates(scene):
+    regel = compile_rules(scene.plate_settings.rules)
+    if _estimate_stale(scene):
+        _part_cache.clear()
+        _material_groups.clear()
+        _material_area.clear()
+        for obj in scene.objects:
+            _estimate_add(obj.session_uid, obj, regel)
+        _estimate_state["scene"] = scene.name
+        _estimate_state["objects"] = len(scene.objects)
+        _estimate_state["rules"] = _rules_signature(scene.plate_settings.rules)
+        _estimate_state["full"] = False
+    else:
+        for uid, name in _dirty_parts.items():
+            _estimate_remove(uid)
+            obj = scene.objects.get(name)
+            if obj is not None and obj.session_uid == uid:
+                _estimate_add(uid, obj, regel)
+    _dirty_parts.clear()
+    _sheet_estimates.clear()
+    for plate in scene.plate_settings.plates:
+        _sheet_estimates[_estimate_key(plate)] = estimate_sheets(plate)
+
+def _estimate_timer():
+    wait = _estimate_state["last_change"] + ESTIMATE_DEBOUNCE - time.monotonic()
+    if wait > 0:
+        return wait
+    scene = bpy.context.scene
+    if scene is None:
+        return None
+    update_sheet_estimates(scene)
+    if _nesting_jobs:
+        mark_stale_nesting_jobs(bpy.context)
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+    return None
+
+def request_sheet_estimate(full=False):
+    if full:
+        _estimate_state["full"] = True
+    _estimate_state["last_change"] = time.monotonic()
+    # nicht persistente Timer verwirft Blender beim Laden einer Datei,
+    # daher den Timer selbst fragen statt eines eigenen Merkers
+    if not bpy.app.timers.is_registered(_estimate_timer):
+        bpy.app.timers.register(_estimate_timer, first_interval=ESTIMATE_DEBOUNCE)
+
+def get_sheet_estimate(plate):
+    est = _sheet_estimates.get(_estimate_key(plate))
+    if est is None and not bpy.app.timers.is_registered(_estimate_timer):
+        request_sheet_estimate()
+    return est
+
+@bpy.app.handlers.persistent
+def _estimate_depsgraph_handler(scene, depsgraph):
+    changed = False
+    for update in depsgraph.updates:
+        id_data = update.id
+        if isinstance(id_data, bpy.types.Object):
+            obj = id_data.original
+            _dirty_parts[obj.session_uid] = obj.name
+            changed = True
+        elif isinstance(id_data, bpy.types.Collection):
+            # Objekte hinzugefügt/entfernt oder verlinkt -> komplett neu einlesen
+            _estimate_state["full"] = True
+            changed = True
+        elif isinstance(id_data, (bpy.types.Scene, bpy.types.Material)):
+            # Platteneinstellungen o. Ä.: Schätzung aus den vorhandenen Teilegruppen,
+            # update_sheet_estimates prüft selbst auf entfernte Objekte/umbenannte Materialien
+            changed = True
+    if changed:
+        request_sheet_estimate()
+
+# --- Spaltenweise Teiletabelle neben der .blend ----------------------------
+# Beim Speichern landet die gruppierte Teiletabelle als unkomprimiertes .npz
+# neben der Datei (<name>.blend.cutlist.npz), damit ERP- und Angebotstools sie
+# ohne Blender und openpyxl lesen können: np.load(pfad)["laenge"] usw.
+
+SIDECAR_SCHEMA = 2  # 2: faser_fix, kanten (n x 4: L1, L2, B1, B2), prioritaet, code
+
+def sidecar_path(blend_path):
+    return blend_path + ".cutlist.npz"
+
+def write_part_sidecar(path, parts_grouped):
+    rows = list(parts_grouped.values())
+    spalten = {"schema": np.array(SIDECAR_SCHEMA, dtype=np.int32)}
+    for col in ("laenge", "breite", "dicke"):
+        spalten[col] = np.array([r[col] for r in rows], dtype=np.float64)
+    spalten["stueckzahl"] = np.array([r["stueckzahl"] for r in rows], dtype=np.int32)
+    for col in ("name", "col_name", "mat_name", "comment", "orientation"):
+        # feste Breite (dtype '<U..'), damit die Spalte ohne Pickle gelesen werden kann
+        spalten[col] = np.array([str(r[col]) for r in rows], dtype=str)
+    spalten["faser_fix"] = np.array([bool(r["grain_lock"]) for r in rows], dtype=bool)
+    spalten["kanten"] = np.array([tuple(r["kanten"]) for r in rows], dtype=bool).reshape(-1, 4)
+    spalten["prioritaet"] = np.array([r["priority"] for r in rows], dtype=np.int32)
+    spalten["code"] = np.array([part_code(r) for r in rows], dtype=str)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as fp:
+        np.savez(fp, **spalten)
+    os.replace(tmp_path, path)
+
+@bpy.app.handlers.persistent
+def _sidecar_save_handler(*_args):
+    scene = bpy.context.scene
+    if not bpy.data.filepath or scene is None or not scene.plate_settings.write_sidecar:
+        return
+    try:
+        parts_grouped = group_parts(collect_objects(bpy.context))
+        write_part_sidecar(sidecar_path(bpy.data.filepath), parts_grouped)
+    except OSError as e:
+        print(f"Cutlist: Teiletabelle konnte nicht geschrieben werden: {e}")
+
+@bpy.app.handlers.persistent
+def _estimate_load_handler(*_args):
+    _dirty_parts.clear()
+    _sheet_estimates.clear()
+    _nesting_state.clear()
+    _library_cache.clear()
+    # laufende Jobs gehören zur vorherigen Datei: anhalten, bleiben fortsetzbar
+    stop_nesting_jobs()
+    plates_changed()
+    request_sheet_estimate(full=True)
+
+# --- Nesting (Reihen-Verfahren, alle Maße in mm) ---------------------------
+# Teile werden links nach rechts in Reihen gelegt, SAW_KERF Abstand zwischen
+# Teilen und Reihen. Ein Layout ist eine Liste von Platten-Dicts mit
+# "length", "width", "offcut_id" (None = neue Platte) und "placements".
+
+def nesting_dims(laenge, breite, orientation):
+    # Maße im Plattensystem: w entlang der Plattenlänge, h entlang der Breite
+    if orientation == "CROSS":
+        return breite, laenge
+    return laenge, breite
+
+def shelf_pack(sheet_l, sheet_b, dims, start=0):
+    # legt dims[start:] der Reihe nach auf, bis ein Teil nicht mehr passt
+    positions = []
+    x, y, rowh = 0.0, 0.0, 0.0
+    idx = start
+    while idx < len(dims):
+        w, h = dims[idx]
+        if x > 0 and x + w > sheet_l:
+            x = 0.0
+            y += rowh + SAW_KERF
+            rowh = 0.0
+        if x + w > sheet_l or y + h > sheet_b:
+            break
+        positions.append((x, y))
+        x += w + SAW_KERF
+        rowh = max(rowh, h)
+        idx += 1
+    return positions, idx
+
+def _new_sheet(length, width, offcut_id=None):
+    return {"length": length, "width": width, "offcut_id": offcut_id, "placements": []}
+
+def _fill_sheet(sheet, parts, dims, indices, positions, orientation, rotations):
+    for idx, (x, y) in zip(indices, positions):
+        laenge, breite, name = parts[idx]
+        w, h = dims[idx]
+        sheet["placements"].append({
+            "x": x, "y": y, "w": w, "h": h, "name": name,
+            "laenge": laenge, "breite": breite,
+            "gedreht": (orientation == "CROSS") != bool(rotations and rotations[idx]),
+        })
+
+def forced_rotations(plate, parts):
+    # bei "Beliebig": Teile, die nur quer auf die Platte passen, müssen gedreht liegen
+    if plate.orientation != "ANY":
+        return [False] * len(parts)
+    return [not (l <= plate.length and b <= plate.width) and b <= plate.length and l <= plate.width
+            for l, b, _n in parts]
+
+def nest_parts(plate, parts, inventory=None, rotations=None):
+    # parts: Liste von (laenge, breite, name); Reststücke aus dem Lager zuerst.
+    # rotations: optional je Teil, ob es gegenüber der Plattenausrichtung gedreht liegt
+    dims = [nesting_dims(l, b, plate.orientation) for l, b, _n in parts]
+    zwang = forced_rotations(plate, parts)
+    if any(zwang):
+        rotations = [z or bool(rotations and rotations[i]) for i, z in enumerate(zwang)]
+    if rotations:
+        dims = [(h, w) if rot else (w, h) for (w, h), rot in zip(dims, rotations)]
+    layout = []
+    rest = list(range(len(parts)))
+    if inventory is not None:
+        rest = []
+        kein_rest = set()
+        idx = 0
+        while idx < len(parts):
+            w, h = dims[idx]
+            offcut = None if (w, h) in kein_rest else inventory.find(plate.name, plate.thickness, w, h)
+            if offcut is None:
+                kein_rest.add((w, h))
+                rest.append(idx)
+                idx += 1
+                continue
+            offcut_id, off_l, off_b = offcut
+            inventory.reserve(offcut_id)
+            positions, next_idx = shelf_pack(off_l, off_b, dims, idx)
+            sheet = _new_sheet(off_l, off_b, offcut_id)
+            _fill_sheet(sheet, parts, dims, range(idx, next_idx), positions, plate.orientation, rotations)
+            layout.append(sheet)
+            idx = next_idx
+    rest_dims = [dims[i] for i in rest]
+    pos = 0
+    while pos < len(rest):
+        positions, next_pos = shelf_pack(plate.length, plate.width, rest_dims, pos)
+        if next_pos == pos:
+            raise ValueError(f"Teil {parts[rest[pos]][2]} passt nicht auf die Platte")
+        sheet = _new_sheet(plate.length, plate.width)
+        _fill_sheet(sheet, parts, dims, rest[pos:next_pos], positions, plate.orientation, rotations)
+        layout.append(sheet)
+        pos = next_pos
+    return layout
+
+def sheet_leftovers(sheet, min_size):
+    # Reststreifen unter der letzten Reihe und rechts neben ihr (guillotine-trennbar)
+    placements = sheet["placements"]
+    if not placements:
+        return [(sheet["length"], sheet["width"])]
+    last_y = max(p["y"] for p in placements)
+    last_row = [p for p in placements if p["y"] == last_y]
+    row_end = last_y + max(p["h"] for p in last_row) + SAW_KERF
+    x_end = max(p["x"] + p["w"] for p in last_row) + SAW_KERF
+    reste = [
+        (sheet["length"], sheet["width"] - row_end),
+        (sheet["length"] - x_end, row_end - last_y - SAW_KERF),
+    ]
+    return [(l, b) for l, b in reste if l >= min_size and b >= min_size]
+
+def nesting_parts_for_plate(context, plate, gesperrt=None):
+    # Teile mit dem Material der Platte; ohne Zuordnung alle Mesh-Objekte.
+    # gesperrt: optionale Menge, nimmt die Namen der Teile mit "Faser fix" auf
+    mesh_objects = collect_objects(context, export_sketch=True)
+    platemat = plate_material_name(plate)
+    gemessen = [(obj, measure_object(obj)) for obj in mesh_objects]
+    passend = [(obj, m) for obj, m in gemessen if m[3] == platemat] or gemessen
+    if gesperrt is not None:
+        gesperrt.update(obj.name for obj, _m in passend if part_props(obj)[2])
+    return [(int(m[0]), int(m[1]), obj.name) for obj, m in passend]
+
+def grain_lock_mask(parts, gesperrt):
+    return np.array([name in gesperrt for _l, _b, name in parts], dtype=bool)
+
+# --- Polygon-Nesting ----------------------------------------------------------
+# Optional für gebogene/schräge Teile: Umriss = konvexe Hülle der Mesh-Punkte
+# in der Ebene der beiden größten Maße (nicht-konvexe Konturen werden also
+# durch ihre Hülle angenähert). Platziert wird Bottom-Left über No-Fit-
+# Polygone; bei konvexen Teilen ist das NFP die Minkowski-Summe A ⊕ (−B),
+# erweitert um ein Quadrat der Schnittfuge. NFPs werden pro
+# (Form, Drehung)-Paar gemerkt und zwischen Läufen in der Nutzer-Ressource
+# abgelegt.
+
+NFP_CACHE_LIMIT = 50000
+_nfp_cache = {}
+_nfp_cache_state = {"loaded": False, "dirty": False}
+
+def nfp_cache_path():
+    return bpy.utils.resource_path('USER') + "/cutlist_nfp_cache.json"
+
+def _load_nfp_cache():
+    if _nfp_cache_state["loaded"]:
+        return
+    _nfp_cache_state["loaded"] = True
+    try:
+        with open(nfp_cache_path(), "r", encoding='utf-8') as fp:
+            for key, pts in json.load(fp).items():
+                _nfp_cache[key] = np.array(pts, dtype=np.float64)
+    except (OSError, ValueError):
+        pass
+
+def save_nfp_cache():
+    if not _nfp_cache_state["dirty"]:
+        return
+    eintraege = list(_nfp_cache.items())[-NFP_CACHE_LIMIT:]
+    with open(nfp_cache_path(), "w", encoding='utf-8') as fp:
+        json.dump({key: pts.round(2).tolist() for key, pts in eintraege}, fp)
+    _nfp_cache_state["dirty"] = False
+
+def convex_hull(points):
+    # Andrew Monotone Chain, Ergebnis gegen den Uhrzeigersinn
+    pts = sorted(set(map(tuple, np.round(np.asarray(points, dtype=np.float64), 1).tolist())))
+    if len(pts) <= 2:
+        return np.array(pts, dtype=np.float64)
+
+    def kreuz(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    unten, oben = [], []
+    for p in pts:
+        while len(unten) >= 2 and kreuz(unten[-2], unten[-1], p) <= 0:
+            unten.pop()
+        unten.append(p)
+    for p in reversed(pts):
+        while len(oben) >= 2 and kreuz(oben[-2], oben[-1], p) <= 0:
+            oben.pop()
+        oben.append(p)
+    return np.array(unten[:-1] + oben[:-1], dtype=np.float64)
+
+def part_outline(obj):
+    # konvexe Hülle in mm, längste Achse entlang x, linke untere Ecke auf (0, 0)
+    mesh = obj.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    co = co.reshape(-1, 3) * np.array(obj.scale, dtype=np.float32)
+    achsen = np.argsort(np.array(obj.dimensions))[::-1][:2]
+    punkte = np.unique(np.round(co[:, achsen], 1), axis=0)
+    hull = convex_hull(punkte)
+    return hull - hull.min(axis=0)
+
+def outline_key(outline):
+    return hashlib.blake2b(np.round(outline, 1).tobytes(), digest_size=8).hexdigest()
+
+def rotate_outline(outline, grad):
+    x, y = outline[:, 0], outline[:, 1]
+    if grad == 90:
+        pts = np.column_stack((-y, x))
+    elif grad == 180:
+        pts = np.column_stack((-x, -y))
+    elif grad == 270:
+        pts = np.column_stack((y, -x))
+    else:
+        pts = outline.copy()
+    return pts - pts.min(axis=0)
+
+def allowed_rotations(orientation):
+    if orientation == "ANY":
+        return (0, 90, 180, 270)
+    if orientation == "CROSS":
+        return (90, 270)
+    return (0, 180)
+
+def no_fit_polygon(key_a, poly_a, key_b, poly_b, kerf):
+    # Lage des Referenzpunkts (0, 0) von B relativ zu A, bei der sich beide berühren
+    cache_key = f"{key_a}|{key_b}|{kerf:g}"
+    nfp = _nfp_cache.get(cache_key)
+    if nfp is None:
+        quadrat = np.array([[-kerf, -kerf], [kerf, -kerf], [kerf, kerf], [-kerf, kerf]])
+        summe = (poly_a[:, None, None, :] - poly_b[None, :, None, :] + quadrat[None, None, :, :]).reshape(-1, 2)
+        nfp = convex_hull(summe)
+        _nfp_cache[cache_key] = nfp
+        _nfp_cache_state["dirty"] = True
+    return nfp
+
+def _inside_any(kandidaten, nfps, eps=1e-6):
+    # True, wo ein Kandidat echt im Inneren eines (verschobenen) NFP liegt
+    innen = np.zeros(len(kandidaten), dtype=bool)
+    for nfp in nfps:
+        lo, hi = nfp.min(axis=0), nfp.max(axis=0)
+        maske = ~innen & np.all((kandidaten > lo + eps) & (kandidaten < hi - eps), axis=1)
+        if not maske.any():
+            continue
+        c = kandidaten[maske]
+        v = nfp
+        e = np.roll(nfp, -1, axis=0) - nfp
+        kreuz = e[None, :, 0] * (c[:, None, 1] - v[None, :, 1]) - e[None, :, 1] * (c[:, None, 0] - v[None, :, 0])
+        innen[np.flatnonzero(maske)[np.all(kreuz > eps, axis=1)]] = True
+    return innen
+
+def _edge_hits(nfp, x0, y0):
+    # Schnittpunkte der NFP-Kanten mit den Rändern x = x0 und y = y0 des Innenbereichs
+    a, b = nfp, np.roll(nfp, -1, axis=0)
+    treffer = []
+    for achse, wert in ((0, x0), (1, y0)):
+        d = b[:, achse] - a[:, achse]
+        gueltig = np.abs(d) > 1e-9
+        s = np.where(gueltig, (wert - a[:, achse]) / np.where(gueltig, d, 1.0), -1.0)
+        ok = gueltig & (s >= 0) & (s <= 1)
+        treffer.append(a[ok] + (b[ok] - a[ok]) * s[ok, None])
+    return np.vstack(treffer) if treffer else np.empty((0, 2))
+
+def _place_polygon(sheet_state, key, poly, kerf):
+    L, B = sheet_state["length"], sheet_state["width"]
+    w, h = poly.max(axis=0)
+    if w > L + 1e-6 or h > B + 1e-6:
+        return None
+    ix1, iy1 = L - w, B - h
+    nfps = [pos + no_fit_polygon(k, p, key, poly, kerf) for k, p, pos in sheet_state["teile"]]
+    kandidaten = [np.array([[0.0, 0.0], [ix1, 0.0], [0.0, iy1]])]
+    for nfp in nfps:
+        kandidaten.append(nfp)
+        kandidaten.append(_edge_hits(nfp, 0.0, 0.0))
+    kandidaten = np.vstack(kandidaten)
+    kandidaten = kandidaten[(kandidaten[:, 0] >= -1e-6) & (kandidaten[:, 0] <= ix1 + 1e-6)
+                            & (kandidaten[:, 1] >= -1e-6) & (kandidaten[:, 1] <= iy1 + 1e-6)]
+    if not len(kandidaten):
+        return None
+    kandidaten = kandidaten[np.lexsort((kandidaten[:, 0], kandidaten[:, 1]))]
+    frei = ~_inside_any(kandidaten, nfps)
+    if not frei.any():
+        return None
+    return np.clip(kandidaten[np.argmax(frei)], 0.0, None)
+
+def nest_polygons(plate, parts, outlines, time_budget=10.0, kerf=SAW_KERF, gesperrt=frozenset()):
+    # parts: (laenge, breite, name); outlines: name -> Umriss. Nach Ablauf des
+    # Zeitbudgets werden die übrigen Teile als Rechtecke per nest_parts gelegt.
+    # Teile aus gesperrt ("Faser fix") werden auch bei "Beliebig" nicht quer gelegt.
+    _load_nfp_cache()
+    ende = time.monotonic() + time_budget
+    reihenfolge = sorted(range(len(parts)), key=lambda i: parts[i][0] * parts[i][1], reverse=True)
+    sheets = []
+    rest = []
+    for idx in reihenfolge:
+        laenge, breite, name = parts[idx]
+        outline = outlines.get(name)
+        if outline is None or time.monotonic() > ende:
+            rest.append(parts[idx])
+            continue
+        basis = outline_key(outline)
+        gesetzt = False
+        for sheet_state in sheets + [None]:
+            neu = sheet_state is None
+            if neu:
+                sheet_state = {"length": plate.length, "width": plate.width, "teile": [], "placements": []}
+            beste = None
+            orientation = "LONG" if plate.orientation == "ANY" and name in gesperrt else plate.orientation
+            for grad in allowed_rotations(orientation):
+                poly = rotate_outline(outline, grad)
+                key = f"{basis}@{grad}"
+                pos = _place_polygon(sheet_state, key, poly, kerf)
+                if pos is not None and (beste is None or (pos[1], pos[0]) < (beste[3][1], beste[3][0])):
+                    beste = (grad, key, poly, pos)
+            if beste is not None:
+                grad, key, poly, pos = beste
+                w, h = poly.max(axis=0)
+                sheet_state["teile"].append((key, poly, pos))
+                sheet_state["placements"].append({
+                    "x": float(pos[0]), "y": float(pos[1]), "w": float(w), "h": float(h), "name": name,
+                    "laenge": laenge, "breite": breite, "gedreht": grad in (90, 270),
+                    "polygon": [(float(px), float(py)) for px, py in poly + pos],
+                })
+                gesetzt = True
+            if gesetzt:
+                if neu:
+                    sheets.append(sheet_state)
+                break
+        if not gesetzt:
+            rest.append(parts[idx])
+    layout = []
+    for sheet_state in sheets:
+        sheet = _new_sheet(sheet_state["length"], sheet_state["width"])
+        sheet["placements"] = sheet_state["placements"]
+        layout.append(sheet)
+    layout.extend(nest_parts(plate, rest))
+    return layout, len(rest)
+
+def polygons_overlap(a, b, eps=1e-6):
+    # Trennachsen-Test für konvexe Polygone (Berührung zählt nicht)
+    for poly in (a, b):
+        for i in range(len(poly)):
+            x0, y0 = poly[i]
+            x1, y1 = poly[(i + 1) % len(poly)]
+            nx, ny = y0 - y1, x1 - x0
+            pa = [nx * x + ny * y for x, y in a]
+            pb = [nx * x + ny * y for x, y in b]
+            if max(pa) <= min(pb) + eps or max(pb) <= min(pa) + eps:
+                return False
+    return True
+
+# --- Layout-Prüfung ----------------------------------------------------------
+# Prüft jede Platzierung auf Plattenrand, Faserrichtung und Überlappung
+# inklusive SAW_KERF-Abstand. Die Überlappung läuft als Sweep-Line über x:
+# aktive Teile liegen nach y sortiert, bei gültigem Layout sind sie in y
+# disjunkt, daher genügen die direkten Nachbarn des neuen Teils.
+
+def part_fits(sheet_l, sheet_b, laenge, breite, orientation):
+    if orientation == "ANY":
+        return (laenge <= sheet_l and breite <= sheet_b) or (breite <= sheet_l and laenge <= sheet_b)
+    w, h = nesting_dims(laenge, breite, orientation)
+    return w <= sheet_l and h <= sheet_b
+
+def split_oversize(plate, parts, gesperrt=frozenset()):
+    # Teile mit "Faser fix" zählen auch bei "Beliebig" nur ungedreht
+    passend, zu_gross = [], []
+    for part in parts:
+        orientation = "LONG" if plate.orientation == "ANY" and part[2] in gesperrt else plate.orientation
+        if part_fits(plate.length, plate.width, part[0], part[1], orientation):
+            passend.append(part)
+        else:
+            zu_gross.append(part)
+    return passend, zu_gross
+
+def _sheet_overlaps(placements, kerf, eps=1e-6):
+    fehler = []
+    ordered = sorted(range(len(placements)), key=lambda i: placements[i]["x"])
+    aktiv = []   # (y, idx), nach y sortiert
+    ablauf = []  # Heap (x_ende + kerf, y, idx)
+    for idx in ordered:
+        p = placements[idx]
+        while ablauf and ablauf[0][0] <= p["x"] + eps:
+            _x, y, alt = heapq.heappop(ablauf)
+            del aktiv[bisect.bisect_left(aktiv, (y, alt))]
+        y0, y1 = p["y"], p["y"] + p["h"]
+        pos = bisect.bisect_left(aktiv, (y0, idx))
+        links = pos - 1
+        while links >= 0:
+            q = placements[aktiv[links][1]]
+            if q["y"] + q["h"] + kerf <= y0 + eps:
+                break
+            fehler.append((q["name"], p["name"]))
+            links -= 1
+        rechts = pos
+        while rechts < len(aktiv) and aktiv[rechts][0] < y1 + kerf - eps:
+            fehler.append((placements[aktiv[rechts][1]]["name"], p["name"]))
+            rechts += 1
+        aktiv.insert(pos, (y0, idx))
+        heapq.heappush(ablauf, (p["x"] + p["w"] + kerf, y0, idx))
+    return fehler
+
+def validate_layout(layout, orientation, kerf=SAW_KERF, eps=1e-6):
+    fehler = []
+    for nummer, sheet in enumerate(layout, start=1):
+        for p in sheet["placements"]:
+            if p["x"] < -eps or p["y"] < -eps or p["x"] + p["w"] > sheet["length"] + eps or p["y"] + p["h"] > sheet["width"] + eps:
+                fehler.append(f"Platte {nummer}: {p['name']} ragt über den Plattenrand")
+            soll = (p["breite"], p["laenge"]) if p["gedreht"] else (p["laenge"], p["breite"])
+            if abs(p["w"] - soll[0]) > 1.0 or abs(p["h"] - soll[1]) > 1.0:
+                fehler.append(f"Platte {nummer}: {p['name']} Maße passen nicht zur Drehung")
+            if orientation != "ANY" and p["gedreht"] != (orientation == "CROSS"):
+                fehler.append(f"Platte {nummer}: {p['name']} liegt gegen die Faserrichtung")
+        if any("polygon" in p for p in sheet["placements"]):
+            # Hüllrechtecke dürfen sich hier überschneiden, geprüft werden die Umrisse selbst
+            for a, b in _polygon_overlaps(sheet["placements"]):
+                fehler.append(f"Platte {nummer}: {a} und {b} überlappen")
+            continue
+        for a, b in _sheet_overlaps(sheet["placements"], kerf, eps):
+            fehler.append(f"Platte {nummer}: {a} und {b} überlappen (inkl. {kerf:g} mm Schnittfuge)")
+    return fehler
+
+def _polygon_overlaps(placements):
+    fehler = []
+    ordered = sorted(placements, key=lambda p: p["x"])
+    for i, p in enumerate(ordered):
+        umriss_p = p.get("polygon") or [(p["x"], p["y"]), (p["x"] + p["w"], p["y"]), (p["x"] + p["w"], p["y"] + p["h"]), (p["x"], p["y"] + p["h"])]
+        for q in ordered[i + 1:]:
+            if q["x"] >= p["x"] + p["w"]:
+                break
+            if q["y"] >= p["y"] + p["h"] or p["y"] >= q["y"] + q["h"]:
+                continue
+            umriss_q = q.get("polygon") or [(q["x"], q["y"]), (q["x"] + q["w"], q["y"]), (q["x"] + q["w"], q["y"] + q["h"]), (q["x"], q["y"] + q["h"])]
+            if polygons_overlap(umriss_p, umriss_q):
+                fehler.append((p["name"], q["name"]))
+    return fehler
+
+# --- Schnittfolge für die Plattensäge ---------------------------------------
+# Zerlegt eine Platte rekursiv in Guillotine-Schnitte: zuerst Längsschnitte
+# (konstantes y, parallel zur Faser), in jedem Streifen Querschnitte, danach
+# ggf. Besäumschnitte. Jeder Schnitt verbraucht SAW_KERF hinter der Position.
+# "mass" ist der Anschlag, also die Breite des abgetrennten Stücks, gemessen
+# vom vorherigen Schnitt im selben Bereich. Innerhalb eines Bereichs bleibt
+# daher die Lage-Reihenfolge; zwischen den Bereichen einer Stufe wird mit
+# gleicher Einstellung weitergesägt, solange ein Bereich als Nächstes genau
+# diesen Anschlag braucht.
+
+def guillotine_cuts(sheet, kerf=SAW_KERF, eps=1e-6):
+    cuts = []
+    nicht_trennbar = []
+    bereich_nr = [0]
+
+    def split(rects, x0, y0, x1, y1, quer, stufe, fehlgeschlagen, bereich=None):
+        if bereich is None:
+            bereich = bereich_nr[0]
+            bereich_nr[0] += 1
+        if len(rects) == 1:
+            p = rects[0]
+            if abs(p["x"] - x0) < eps and abs(p["y"] - y0) < eps and abs(p["x"] + p["w"] - x1) < eps and abs(p["y"] + p["h"] - y1) < eps:
+                return
+        a0, a1 = (x0, x1) if quer else (y0, y1)
+        gruppen = []
+        for p in sorted(rects, key=lambda p: p["x"] if quer else p["y"]):
+            start = p["x"] if quer else p["y"]
+            ende = start + (p["w"] if quer else p["h"])
+            if gruppen and start < gruppen[-1][2] + kerf - eps:
+                gruppen[-1][0].append(p)
+                gruppen[-1][2] = max(gruppen[-1][2], ende)
+            else:
+                gruppen.append([[p], start, ende])
+        bereiche = []
+        pos = a0
+        for teile, g_start, g_ende in gruppen:
+            if g_start - kerf > pos + eps:
+                # Verschnitt vor der Gruppe abtrennen
+                cuts.append(_cut(quer, stufe, bereich, g_start - kerf, g_start - kerf - pos, x0, y0, x1, y1))
+                pos = g_start
+            if g_ende < a1 - eps:
+                cuts.append(_cut(quer, stufe, bereich, g_ende, g_ende - pos, x0, y0, x1, y1))
+            bereiche.append((teile, pos, g_ende))
+            pos = g_ende + kerf
+        if len(bereiche) == 1 and bereiche[0][1] == a0 and bereiche[0][2] >= a1 - eps:
+            # in dieser Richtung kein Schnitt möglich
+            if fehlgeschlagen:
+                nicht_trennbar.extend(p["name"] for p in rects)
+                return
+            split(rects, x0, y0, x1, y1, not quer, stufe, True, bereich)
+            return
+        for teile, b0, b1 in bereiche:
+            if quer:
+                split(teile, b0, y0, b1, y1, False, stufe + 1, False)
+            else:
+                split(teile, x0, b0, x1, b1, True, stufe + 1, False)
+
+    if sheet["placements"]:
+        split(sheet["placements"], 0.0, 0.0, sheet["length"], sheet["width"], False, 1, False)
+    return cuts, nicht_trennbar
+
+def _cut(quer, stufe, bereich, position, mass, x0, y0, x1, y1):
+    if quer:
+        return {"stufe": stufe, "bereich": bereich, "art": "Querschnitt", "position": position, "mass": round(mass, 1),
+                "linie": (position, y0, position, y1)}
+    return {"stufe": stufe, "bereich": bereich, "art": "Längsschnitt", "position": position, "mass": round(mass, 1),
+            "linie": (x0, position, x1, position)}
+
+def order_cuts(cuts):
+    # Stufe für Stufe; pro Bereich eine Warteschlange in Lage-Reihenfolge
+    stufen = {}
+    for cut in cuts:
+        stufen.setdefault(cut["stufe"], {}).setdefault(cut["bereich"], []).append(cut)
+    folge = []
+    for stufe in sorted(stufen):
+        offen = [list(reversed(q)) for q in stufen[stufe].values()]
+        einstellung = None
+        while offen:
+            gleich = [q for q in offen if (q[-1]["art"], q[-1]["mass"]) == einstellung]
+            if not gleich:
+                einstellung = (offen[0][-1]["art"], offen[0][-1]["mass"])
+                continue
+            for q in gleich:
+                while q and (q[-1]["art"], q[-1]["mass"]) == einstellung:
+                    folge.append(q.pop())
+            offen = [q for q in offen if q]
+    return folge
+
+def cut_sequence(sheet, kerf=SAW_KERF):
+    cuts, nicht_trennbar = guillotine_cuts(sheet, kerf)
+    cuts = order_cuts(cuts)
+    einstellung, vorher = 0, None
+    for nr, cut in enumerate(cuts, start=1):
+        cut["nr"] = nr
+        if (cut["art"], cut["mass"]) != vorher:
+            einstellung += 1
+            vorher = (cut["art"], cut["mass"])
+        cut["einstellung"] = einstellung
+    return cuts, nicht_trennbar
+
+def write_cut_sheet(wb, plate_layouts):
+    # plate_layouts: Liste von (plate, layout)
+    ws = wb.create_sheet("Schnittfolge")
+    ws.append(['Plattenname', 'Format (mm)', 'Platte', 'Schnitt', 'Art', 'Stufe', 'Einstellung', 'Anschlag (mm)', 'Position (mm)', 'Schnittlänge (mm)'])
+    for plate, layout in plate_layouts:
+        for nummer, sheet in enumerate(layout, start=1):
+            for cut in sheet.get("cuts") or cut_sequence(sheet)[0]:
+                lx0, ly0, lx1, ly1 = cut["linie"]
+                ws.append([plate.name, f"{int(sheet['length'])} x {int(sheet['width'])}", nummer, cut["nr"], cut["art"],
+                           cut["stufe"], cut["einstellung"], cut["mass"], round(cut["position"], 1),
+                           round(abs(lx1 - lx0) + abs(ly1 - ly0), 1)])
+    return ws
+
+# --- Inkrementelles Nesting -------------------------------------------------
+# Pro Platte (Material + Ausrichtung) bleibt das letzte Layout samt Teilemaßen
+# erhalten. Bei einer Änderung werden nur die Platten neu gepackt, auf denen
+# entfernte oder geänderte Teile lagen (neue Teile kommen auf die letzte
+# volle Platte); alle anderen Platten werden unverändert übernommen.
+
+_nesting_state = {}  # (mat_name, orientation) -> {"plate": (länge, breite), "parts": {name: (l, b)}, "layout": [...], "offcuts": bool, "dichte": float}
+
+def nesting_state_key(plate):
+    return (plate_material_name(plate), plate.orientation)
+
+def diff_parts(alt, neu):
+    added = [name for name in neu if name not in alt]
+    removed = [name for name in alt if name not in neu]
+    resized = [name for name in neu if name in alt and alt[name] != neu[name]]
+    return added, removed, resized
+
+def renest_incremental(plate, layout, alt, parts):
+    neu = {name: (l, b) for l, b, name in parts}
+    added, removed, resized = diff_parts(alt, neu)
+    geaendert = set(removed) | set(resized)
+    betroffen = [i for i, sheet in enumerate(layout) if any(p["name"] in geaendert for p in sheet["placements"])]
+    if not betroffen and not added:
+        return layout, []
+    # neue und überzählige Teile zuerst auf die letzte (meist nur teilweise belegte) Platte
+    letzte = max((i for i, sheet in enumerate(layout) if sheet["offcut_id"] is None), default=None)
+    if letzte is not None and letzte not in betroffen:
+        betroffen.append(letzte)
+        betroffen.sort()
+    pool, rotations = [], []
+    for i in betroffen:
+        for p in layout[i]["placements"]:
+            if p["name"] in neu:
+                l, b = neu[p["name"]]
+                pool.append((l, b, p["name"]))
+                rotations.append(p["gedreht"] != (plate.orientation == "CROSS"))
+    neue = [(neu[name][0], neu[name][1], name) for name in added]
+    pool.extend(neue)
+    rotations.extend(forced_rotations(plate, neue))
+    dims = [nesting_dims(l, b, plate.orientation) for l, b, _n in pool]
+    dims = [(h, w) if rot else (w, h) for (w, h), rot in zip(dims, rotations)]
+    neu_gepackt = {}
+    pos = 0
+    for i in betroffen:
+        alt_sheet = layout[i]
+        positions, next_pos = shelf_pack(alt_sheet["length"], alt_sheet["width"], dims, pos)
+        sheet = _new_sheet(alt_sheet["length"], alt_sheet["width"], alt_sheet["offcut_id"])
+        _fill_sheet(sheet, pool, dims, range(pos, next_pos), positions, plate.orientation, rotations)
+        neu_gepackt[i] = sheet
+        pos = next_pos
+    zusatz = []
+    while pos < len(pool):
+        positions, next_pos = shelf_pack(plate.length, plate.width, dims, pos)
+        if next_pos == pos:
+            raise ValueError(f"Teil {pool[pos][2]} passt nicht auf die Platte")
+        sheet = _new_sheet(plate.length, plate.width)
+        _fill_sheet(sheet, pool, dims, range(pos, next_pos), positions, plate.orientation, rotations)
+        zusatz.append(sheet)
+        pos = next_pos
+    merged = [neu_gepackt.get(i, sheet) for i, sheet in enumerate(layout)]
+    return [sheet for sheet in merged if sheet["placements"]] + zusatz, betroffen
+
+INCREMENTAL_SLACK = 0.02   # erlaubter Mehrbedarf gegenüber dem letzten Komplettlauf
+
+def area_bound(plate, parts):
+    return max(1, math.ceil(sum(l * b for l, b, _n in parts) / (plate.length * plate.width) - 1e-9))
+
+def nest_parts_cached(plate, parts, inventory=None, incremental=True):
+    key = nesting_state_key(plate)
+    state = _nesting_state.get(key)
+    # Reststücke ändern sich zwischen zwei Läufen (verbraucht, neu eingelagert, IDs
+    # wiederverwendet) -> mit Reststücken im Lager oder im alten Layout immer komplett neu
+    lager = inventory is not None and inventory.count(plate.name, plate.thickness) > 0
+    dichte = None
+    if (incremental and not lager and state is not None and not state["offcuts"]
+            and state["plate"] == (plate.length, plate.width)):
+        layout, betroffen = renest_incremental(plate, state["layout"], state["parts"], parts)
+        # Platten pro Flächen-Untergrenze wie im letzten Komplettlauf, sonst neu packen
+        dichte = state["dichte"]
+        if len(layout) > dichte * area_bound(plate, parts) * (1 + INCREMENTAL_SLACK) + 1:
+            dichte = None
+    if dichte is None:
+        layout = nest_parts(plate, parts, inventory)
+        betroffen = list(range(len(layout)))
+    remember_nesting(plate, parts, layout, dichte)
+    return layout, betroffen
+
+def remember_nesting(plate, parts, layout, dichte=None):
+    # dichte: aus einem Komplettlauf übernommen; None = layout ist selbst einer
+    if dichte is None:
+        dichte = len(layout) / area_bound(plate, parts) if parts else 1.0
+    _nesting_state[nesting_state_key(plate)] = {
+        "plate": (plate.length, plate.width),
+        "parts": {name: (l, b) for l, b, name in parts},
+        "layout": layout,
+        "offcuts": any(sheet["offcut_id"] is not None for sheet in layout),
+        "dichte": dichte,
     }
+
+# --- Nachoptimierung (Simulated Annealing) ---------------------------------
+# Sucht über Reihenfolge und – bei Ausrichtung "Beliebig" – Drehung der Teile
+# (außer Teilen mit "Faser fix", siehe locked).
+# Die Nachbarn eines Zustands werden als Stapel erzeugt und gemeinsam
+# bewertet: shelf_pack läuft Teil für Teil, aber über alle Kandidaten
+# gleichzeitig als NumPy-Vektoren. Bewertung = Plattenzahl minus Anteil des
+# freien Streifens auf der letzten Platte (kleiner ist besser).
+
+class NestingAnnealer:
+    def __init__(self, sheet_l, sheet_b, parts, orientation, batch_size=32, seed=None, locked=None):
+        self.sheet_l = float(sheet_l)
+        self.sheet_b = float(sheet_b)
+        base = [nesting_dims(l, b, orientation) for l, b, _n in parts]
+        self.w = np.array([d[0] for d in base], dtype=np.float64)
+        self.h = np.array([d[1] for d in base], dtype=np.float64)
+        self.allow_rotation = orientation == "ANY"
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+        n = len(parts)
+        self.locked = np.zeros(n, dtype=bool) if locked is None else np.asarray(locked, dtype=bool)
+        self.rot = np.zeros(n, dtype=bool)
+        if self.allow_rotation:
+            # nur in einer Lage passende Teile liegen fest in dieser Lage
+            laengs = (self.w <= self.sheet_l) & (self.h <= self.sheet_b)
+            quer = (self.h <= self.sheet_l) & (self.w <= self.sheet_b)
+            self.rot = ~laengs & quer & ~self.locked
+            self.locked = self.locked | ~(laengs & quer)
+        self.allow_rotation = self.allow_rotation and not self.locked.all()
+        self.order = np.arange(n)
+        self.score = float(self.evaluate(self.order[None], self.rot[None])[0][0])
+        self.start_score = self.score
+        self.best_order = self.order.copy()
+        self.best_rot = self.rot.copy()
+        self.best_score = self.score
+        self.iteration = 0
+        self.elapsed = 0.0
+
+    def evaluate(self, orders, rots):
+        # orders/rots: (B, n) -> (Bewertung, Plattenzahl) je Kandidat
+        w = self.w[orders]
+        h = self.h[orders]
+        w, h = np.where(rots, h, w), np.where(rots, w, h)
+        anzahl = orders.shape[0]
+        x = np.zeros(anzahl)
+        y = np.zeros(anzahl)
+        rowh = np.zeros(anzahl)
+        sheets = np.ones(anzahl)
+        for k in range(orders.shape[1]):
+            wk = w[:, k]
+            hk = h[:, k]
+            newrow = (x > 0) & (x + wk > self.sheet_l)
+            y = np.where(newrow, y + rowh + SAW_KERF, y)
+            x = np.where(newrow, 0.0, x)
+            rowh = np.where(newrow, 0.0, rowh)
+            newsheet = (x + wk > self.sheet_l) | (y + hk > self.sheet_b)
+            sheets += newsheet
+            x = np.where(newsheet, 0.0, x)
+            y = np.where(newsheet, 0.0, y)
+            rowh = np.where(newsheet, 0.0, rowh)
+            x += wk + SAW_KERF
+            rowh = np.maximum(rowh, hk)
+        frei = np.clip(self.sheet_b - (y + rowh + SAW_KERF), 0.0, None) / self.sheet_b
+        return sheets - frei, sheets
+
+    def neighbours(self):
+        n = len(self.order)
+        orders = np.repeat(self.order[None], self.batch_size, axis=0)
+        rots = np.repeat(self.rot[None], self.batch_size, axis=0)
+        zug = self.rng.integers(0, 3 if self.allow_rotation else 2, size=self.batch_size)
+        i = self.rng.integers(0, n, size=self.batch_size)
+        j = self.rng.integers(0, n, size=self.batch_size)
+        rows = np.arange(self.batch_size)
+        tausch = zug == 0
+        a, b = orders[rows[tausch], i[tausch]], orders[rows[tausch], j[tausch]]
+        orders[rows[tausch], i[tausch]] = b
+        orders[rows[tausch], j[tausch]] = a
+        for r in rows[zug == 1]:
+            # Teil an eine andere Stelle verschieben
+            teil = orders[r, i[r]]
+            rest = np.delete(orders[r], i[r])
+            orders[r] = np.insert(rest, j[r], teil)
+        dreh = zug == 2
+        teil = orders[rows[dreh], i[dreh]]
+        rots[rows[dreh], teil] ^= ~self.locked[teil]
+        return orders, rots
+
+    def step(self, temperature):
+        orders, rots = self.neighbours()
+        scores, _sheets = self.evaluate(orders, rots[np.arange(len(orders))[:, None], orders])
+        k = int(np.argmin(scores))
+        delta = scores[k] - self.score
+        if delta <= 0 or self.rng.random() < math.exp(-delta / max(temperature, 1e-9)):
+            self.order = orders[k]
+            self.rot = rots[k]
+            self.score = float(scores[k])
+            if self.score < self.best_score:
+                self.best_order = self.order.copy()
+                self.best_rot = self.rot.copy()
+                self.best_score = self.score
+        self.iteration += 1
+
+    def run(self, time_budget, max_iterations, t_start=0.5, t_end=0.005, slice_seconds=None):
+        # -> True, wenn Budget oder Iterationen erschöpft sind. Mit slice_seconds
+        # wird nach dieser Zeit unterbrochen; ein weiterer Aufruf setzt fort.
+        if len(self.order) < 2:
+            return True
+        start = time.monotonic() - self.elapsed
+        ende = time.monotonic() + slice_seconds if slice_seconds else None
+        while self.iteration < max_iterations:
+            jetzt = time.monotonic()
+            self.elapsed = jetzt - start
+            fortschritt = max(self.elapsed / time_budget if time_budget > 0 else 0.0,
+                              self.iteration / max_iterations)
+            if fortschritt >= 1.0:
+                return True
+            if ende is not None and jetzt >= ende:
+                return False
+            self.step(t_start * (t_end / t_start) ** fortschritt)
+        self.elapsed = time.monotonic() - start
+        return True
+
+    def get_state(self):
+        return {
+            "order": self.order, "rot": self.rot, "best_order": self.best_order, "best_rot": self.best_rot,
+            "score": self.score, "best_score": self.best_score, "start_score": self.start_score,
+            "iteration": self.iteration, "elapsed": self.elapsed, "rng": self.rng.bit_generator.state,
+        }
+
+    def set_state(self, state):
+        self.order = np.asarray(state["order"], dtype=np.int64)
+        self.rot = np.asarray(state["rot"], dtype=bool)
+        self.best_order = np.asarray(state["best_order"], dtype=np.int64)
+        self.best_rot = np.asarray(state["best_rot"], dtype=bool)
+        self.score = float(state["score"])
+        self.best_score = float(state["best_score"])
+        self.start_score = float(state["start_score"])
+        self.iteration = int(state["iteration"])
+        self.elapsed = float(state["elapsed"])
+        self.rng.bit_generator.state = state["rng"]
+
+    def best_parts(self, parts):
+        # Teile in bester Reihenfolge plus Drehungen für nest_parts()
+        order = [int(i) for i in self.best_order]
+        return [parts[i] for i in order], [bool(self.best_rot[i]) for i in order]
+
+# --- Nesting-Jobs mit Checkpoints --------------------------------------------
+# Lange Optimierungen laufen in Zeitscheiben über bpy.app.timers (im
+# Hintergrundmodus blockierend). Pro Job gibt es ein Verzeichnis unter
+# <Nutzer-Ressource>/cutlist_jobs/<id> mit job.json (Platte, Teile, Budget,
+# Status, RNG-Zustand) und state.npz (Reihenfolgen/Drehungen). Die Job-ID ist
+# ein Hash aus Platte und Teilen: gleiche Eingaben setzen denselben Job fort.
+
+JOB_SLICE = 0.02           # s Rechenzeit pro Timer-Aufruf
+JOB_INTERVAL = 0.1         # s zwischen zwei Timer-Aufrufen, die UI bleibt bedienbar
+JOB_CHECKPOINT_EVERY = 10.0  # s zwischen zwei Checkpoints
+_nesting_jobs = {}         # job_id -> NestingJob (laufend)
+_finished_jobs = {}        # job_id -> NestingJob, in dieser Sitzung fertig geworden (Anzeige im Panel)
+
+class PlateSnapshot:
+    # Plattenwerte ohne Bezug auf Blender-Daten, für Jobs und Checkpoints
+    __slots__ = ("name", "length", "width", "thickness", "orientation", "cost")
+
+    def __init__(self, name, length, width, thickness, orientation, cost=0.0):
+        self.name, self.length, self.width = name, float(length), float(width)
+        self.thickness, self.orientation, self.cost = float(thickness), orientation, float(cost)
+
+    @classmethod
+    def from_plate(cls, plate):
+        return cls(plate.name, plate.length, plate.width, plate.thickness, plate.orientation, plate.cost)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def nesting_dict(self):
+        # ohne Preis: der ändert das Layout nicht
+        return {name: getattr(self, name) for name in self.__slots__ if name != "cost"}
+
+def nesting_jobs_dir():
+    pfad = os.path.join(bpy.utils.resource_path('USER'), "cutlist_jobs")
+    os.makedirs(pfad, exist_ok=True)
+    return pfad
+
+def nesting_job_id(plate, parts, locked=()):
+    eingaben = [plate.nesting_dict(), [list(p) for p in parts]]
+    if any(locked):
+        eingaben.append([bool(x) for x in locked])
+    schluessel = json.dumps(eingaben, sort_keys=True)
+    return hashlib.blake2b(schluessel.encode("utf-8"), digest_size=8).hexdigest()
+
+def list_nesting_jobs():
+    jobs = []
+    wurzel = nesting_jobs_dir()
+    for job_id in os.listdir(wurzel):
+        try:
+            with open(os.path.join(wurzel, job_id, "job.json"), encoding="utf-8") as fp:
+                meta = json.load(fp)
+        except (OSError, ValueError):
+            continue
+        jobs.append(meta)
+    jobs.sort(key=lambda meta: meta.get("updated", 0), reverse=True)
+    return jobs
+
+class NestingJob:
+    def __init__(self, plate, parts, time_budget, max_iterations, job_id=None, locked=None):
+        self.plate = plate
+        self.parts = [tuple(p) for p in parts]
+        self.locked = [bool(x) for x in locked] if locked is not None else [False] * len(self.parts)
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.job_id = job_id or nesting_job_id(plate, self.parts, self.locked)
+        self.annealer = NestingAnnealer(plate.length, plate.width, self.parts, plate.orientation, locked=self.locked)
+        self.status = "running"
+        self.stale = False
+        self.last_checkpoint = time.monotonic()
+        self.checkpoint_score = self.annealer.best_score
+
+    @property
+    def directory(self):
+        return os.path.join(nesting_jobs_dir(), self.job_id)
+
+    def best_layout(self):
+        parts, rotations = self.annealer.best_parts(self.parts)
+        return nest_parts(self.plate, parts, None, rotations)
+
+    def progress(self):
+        return min(1.0, max(self.annealer.elapsed / self.time_budget if self.time_budget > 0 else 0.0,
+                            self.annealer.iteration / self.max_iterations))
+
+    def checkpoint(self):
+        os.makedirs(self.directory, exist_ok=True)
+        state = self.annealer.get_state()
+        npz_path = os.path.join(self.directory, "state.npz")
+        with open(npz_path + ".tmp", "wb") as fp:
+            np.savez(fp, order=state["order"], rot=state["rot"], best_order=state["best_order"], best_rot=state["best_rot"])
+        os.replace(npz_path + ".tmp", npz_path)
+        meta = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "plate": self.plate.to_dict(),
+            "parts": [list(p) for p in self.parts],
+            "locked": self.locked,
+            "time_budget": self.time_budget,
+            "max_iterations": self.max_iterations,
+            "score": state["score"], "best_score": state["best_score"], "start_score": state["start_score"],
+            "iteration": state["iteration"], "elapsed": state["elapsed"], "rng": state["rng"],
+            "best_sheets": math.ceil(state["best_score"]),
+            "updated": time.time(),
+        }
+        json_path = os.path.join(self.directory, "job.json")
+        with open(json_path + ".tmp", "w", encoding="utf-8") as fp:
+            json.dump(meta, fp)
+        os.replace(json_path + ".tmp", json_path)
+        self.last_checkpoint = time.monotonic()
+        self.checkpoint_score = state["best_score"]
+
+    @classmethod
+    def load(cls, job_id):
+        directory = os.path.join(nesting_jobs_dir(), job_id)
+        with open(os.path.join(directory, "job.json"), encoding="utf-8") as fp:
+            meta = json.load(fp)
+        job = cls(PlateSnapshot(**meta["plate"]), meta["parts"], meta["time_budget"], meta["max_iterations"],
+                  job_id=job_id, locked=meta.get("locked"))
+        with np.load(os.path.join(directory, "state.npz")) as arrays:
+            state = {name: arrays[name] for name in ("order", "rot", "best_order", "best_rot")}
+        state.update({name: meta[name] for name in ("score", "best_score", "start_score", "iteration", "elapsed", "rng")})
+        job.annealer.set_state(state)
+        job.status = meta["status"]
+        return job
+
+    def run_slice(self, slice_seconds=JOB_SLICE):
+        # -> True, wenn der Job fertig ist; speichert bei Verbesserung bzw. am Ende
+        fertig = self.annealer.run(self.time_budget, self.max_iterations, slice_seconds=slice_seconds)
+        if fertig:
+            self.status = "done"
+        verbessert = self.annealer.best_score < self.checkpoint_score
+        if fertig or (verbessert and time.monotonic() - self.last_checkpoint >= JOB_CHECKPOINT_EVERY):
+            self.checkpoint()
+            publish_job_layout(self)
+        return fertig
+
+def publish_job_layout(job):
+    # bestes Layout sofort nutzbar machen: Schnittbild-Zustand und Vorschau
+    layout = job.best_layout()
+    remember_nesting(job.plate, job.parts, layout)
+    try:
+        settings = bpy.context.scene.plate_settings
+        update_preview_image(render_nesting(layout[:20], job.plate, settings.font_size, settings.font_path))
+    except (ImportError, AttributeError):
+        pass
+    return layout
+
+_job_redraw = {"last": 0.0}
+
+def _nesting_job_timer():
+    for job_id, job in list(_nesting_jobs.items()):
+        if job.run_slice():
+            _finished_jobs[job_id] = _nesting_jobs.pop(job_id)
+    if time.monotonic() - _job_redraw["last"] >= 1.0 or not _nesting_jobs:
+        # Fortschritt im Panel etwa einmal pro Sekunde auffrischen
+        _job_redraw["last"] = time.monotonic()
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+    return JOB_INTERVAL if _nesting_jobs else None
+
+def start_nesting_job(job, blocking=False):
+    job.status = "running"
+    job.checkpoint()
+    layout = publish_job_layout(job)
+    _finished_jobs.pop(job.job_id, None)
+    if blocking:
+        while not job.run_slice(JOB_CHECKPOINT_EVERY):
+            if bpy.app.background:
+                # ohne Oberfläche bleibt nur die Konsole für den Fortschritt
+                print(f"Cutlist: Nesting-Job {job.job_id}: {job.progress():.0%}, bisher {math.ceil(job.annealer.best_score)} Platten")
+        return job.best_layout()
+    _nesting_jobs[job.job_id] = job
+    if not bpy.app.timers.is_registered(_nesting_job_timer):
+        bpy.app.timers.register(_nesting_job_timer, first_interval=JOB_INTERVAL)
+    return layout
+
+def mark_stale_nesting_jobs(context):
+    # Szene geändert: Jobs laufen weiter, rechnen aber evtl. mit alten Teilen.
+    # Die Job-ID ist der Hash der Eingaben, also genügt ein Vergleich.
+    plates = {}
+    for plate in context.scene.plate_settings.plates:
+        snapshot = PlateSnapshot.from_plate(plate)
+        plates.setdefault(json.dumps(snapshot.nesting_dict(), sort_keys=True), (plate, snapshot))
+    for job in _nesting_jobs.values():
+        eintrag = plates.get(json.dumps(job.plate.nesting_dict(), sort_keys=True))
+        if eintrag is None:
+            job.stale = True
+            continue
+        plate, snapshot = eintrag
+        gesperrt = set()
+        parts, _zu_gross = split_oversize(snapshot, nesting_parts_for_plate(context, plate, gesperrt), gesperrt)
+        job.stale = nesting_job_id(snapshot, parts, grain_lock_mask(parts, gesperrt)) != job.job_id
+
+def stop_nesting_jobs():
+    for job in _nesting_jobs.values():
+        job.status = "paused"
+        job.checkpoint()
+    anzahl = len(_nesting_jobs)
+    _nesting_jobs.clear()
+    _finished_jobs.clear()
+    if bpy.app.timers.is_registered(_nesting_job_timer):
+        bpy.app.timers.unregister(_nesting_job_timer)
+    return anzahl
+
+# --- Formatwahl: günstigste Mischung mehrerer Plattenformate ---------------
+# Gleiches Material (Plattenname + Dicke) kann in mehreren Formaten im Lager
+# liegen. Die Teile werden nach Fläche absteigend sortiert; jede Platte nimmt
+# per shelf_pack einen zusammenhängenden Abschnitt auf. Gesucht ist der
+# günstigste Weg von Teil 0 bis zum Ende (kürzester Weg im DAG der
+# Teileindizes). Flächen-Untergrenze und Einzelformat-Obergrenze schneiden
+# aussichtslose Zustände ab; Packergebnisse pro (Format, Startindex) und
+# komplette Lösungen werden gemerkt.
+
+STOCK_MIX_CACHE_SIZE = 32
+_stock_mix_cache = {}   # (stock, Hash der Teileliste) -> Lösung, älteste zuerst
+
+def plate_cost(plate, mit_preis=True):
+    # ohne Preis zählt die Plattenfläche in m²
+    return plate.cost if mit_preis and plate.cost > 0 else plate.length * plate.width / 1e6
+
+def stock_costs(gruppe):
+    # Preise und m² sind nicht vergleichbar: nur wenn alle Formate einen Preis haben, zählt er
+    bepreist = [p.cost > 0 for p in gruppe]
+    if any(bepreist) and not all(bepreist):
+        warnung = f"{gruppe[0].name}: nicht alle Formate haben einen Preis, Formatwahl nach Fläche."
+        return [plate_cost(p, mit_preis=False) for p in gruppe], warnung
+    return [plate_cost(p) for p in gruppe], None
+
+def parts_hash(parts):
+    teile = np.array(sorted(parts), dtype=np.float64)
+    return hashlib.blake2b(teile.tobytes(), digest_size=16).hexdigest()
+
+def stock_groups(plates):
+    groups = {}
+    for plate in plates:
+        groups.setdefault((plate.name, plate.thickness), []).append(plate)
+    return groups
+
+def solve_stock_mix(stock, parts):
+    # stock: Liste von (länge, breite, orientation, kosten); parts: Liste von (laenge, breite)
+    cache_key = (tuple(stock), parts_hash(parts))
+    if cache_key in _stock_mix_cache:
+        return _stock_mix_cache[cache_key]
+    passend = [
+        p for p in parts
+        if any(nesting_dims(p[0], p[1], o)[0] <= l and nesting_dims(p[0], p[1], o)[1] <= b for l, b, o, _c in stock)
+    ]
+    ordered = sorted(passend, key=lambda p: p[0] * p[1], reverse=True)
+    n = len(ordered)
+    dims = [[nesting_dims(l, b, o) for l, b in ordered] for _l, _b, o, _c in stock]
+    suffix_area = [0.0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        suffix_area[i] = suffix_area[i + 1] + ordered[i][0] * ordered[i][1]
+    min_cost_per_area = min(c / (l * b) for l, b, _o, c in stock)
+    memo = {}
+
+    def next_index(s, i):
+        if (s, i) not in memo:
+            l, b, _o, _c = stock[s]
+            memo[(s, i)] = shelf_pack(l, b, dims[s], i)[1]
+        return memo[(s, i)]
+
+    # Obergrenze: bestes reines Einzelformat (passt ein Teil nicht, ist das Format ausgeschlossen)
+    best_cost, best_path = math.inf, None
+    for s, (_l, _b, _o, c) in enumerate(stock):
+        i, path = 0, []
+        while i < n:
+            j = next_index(s, i)
+            if j == i:
+                break
+            path.append(s)
+            i = j
+        if i == n and len(path) * c < best_cost:
+            best_cost, best_path = len(path) * c, path
+
+    dist = {0: 0.0}
+    prev = {}
+    offen = [0]
+    while offen:
+        i = heapq.heappop(offen)
+        if i == n:
+            continue
+        if dist[i] + suffix_area[i] * min_cost_per_area >= best_cost - 1e-9:
+            continue
+        for s, (_l, _b, _o, c) in enumerate(stock):
+            j = next_index(s, i)
+            if j == i:
+                continue
+            d = dist[i] + c
+            if d < dist.get(j, math.inf) - 1e-9:
+                if j not in dist:
+                    heapq.heappush(offen, j)
+                dist[j] = d
+                prev[j] = (i, s)
+    if n in prev and dist[n] < best_cost - 1e-9:
+        best_cost, best_path = dist[n], []
+        j = n
+        while j:
+            i, s = prev[j]
+            best_path.append(s)
+            j = i
+        best_path.reverse()
+    mix = [0] * len(stock)
+    for s in best_path or []:
+        mix[s] += 1
+    result = {"mix": mix, "kosten": 0.0 if best_path is None else best_cost, "nicht_platziert": len(parts) - len(passend)}
+    while len(_stock_mix_cache) >= STOCK_MIX_CACHE_SIZE:
+        del _stock_mix_cache[next(iter(_stock_mix_cache))]
+    _stock_mix_cache[cache_key] = result
+    return result
+
+def sheet_demand(plates, parts_grouped):
+    # Plattenbedarf je Platte: Rasterzählung, bei mehreren Formaten die günstigste Mischung
+    bedarf, warnungen = [], []
+    for gruppe in stock_groups(plates).values():
+        if len(gruppe) == 1:
+            plate = gruppe[0]
+            platemat = plate_material_name(plate)
+            benoetigte_platten = 0
+            for p in parts_grouped.values():
+                if p["mat_name"] == platemat:
+                    benoetigte_platten += math.ceil(p["stueckzahl"] / teile_pro_platte(plate, p["laenge"], p["breite"]))
+            bedarf.append((plate, benoetigte_platten))
+            continue
+        platemats = {plate_material_name(p) for p in gruppe}
+        teile = [(p["laenge"], p["breite"]) for p in parts_grouped.values() if p["mat_name"] in platemats for _ in range(p["stueckzahl"])]
+        if not teile:
+            bedarf.extend((plate, 0) for plate in gruppe)
+            continue
+        kosten, warnung = stock_costs(gruppe)
+        if warnung:
+            warnungen.append(warnung)
+        loesung = solve_stock_mix([(p.length, p.width, p.orientation, c) for p, c in zip(gruppe, kosten)], teile)
+        if loesung["nicht_platziert"]:
+            warnungen.append(f"{loesung['nicht_platziert']} Teile passen auf kein Format von {gruppe[0].name}.")
+        bedarf.extend(zip(gruppe, loesung["mix"]))
+    return bedarf, warnungen
+
+# --- Reststück-Lager (SQLite) ----------------------------------------------
+# Reststücke werden pro Plattenname und Dicke geführt; length liegt wie bei
+# der Platte in Faserrichtung. Der abdeckende Index (material, thickness, area,
+# length, width) liefert das kleinste passende Stück, ohne die Tabelle zu lesen.
+
+def offcut_db_path():
+    return bpy.utils.resource_path('USER') + "/cutlist_offcuts.sqlite"
+
+class OffcutInventory:
+    def __init__(self, path=None):
+        self.conn = sqlite3.connect(path or offcut_db_path())
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS offcuts ("
+            "id INTEGER PRIMARY KEY, material TEXT NOT NULL, thickness REAL NOT NULL, "
+            "length REAL NOT NULL, width REAL NOT NULL, area REAL NOT NULL, source TEXT, created REAL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS offcuts_fit ON offcuts (material, thickness, area, length, width)"
+        )
+        self.conn.commit()
+
+    def find(self, material, thickness, length, width):
+        # kleinstes passendes Reststück, das in diesem Lauf noch nicht verplant ist
+        return self.conn.execute(
+            "SELECT id, length, width FROM offcuts "
+            "WHERE material = ? AND thickness = ? AND area >= ? AND length >= ? AND width >= ? "
+            "ORDER BY area LIMIT 1",
+            (material, thickness, length * width, length, width),
+        ).fetchone()
+
+    def reserve(self, offcut_id):
+        # nur innerhalb der offenen Transaktion; ohne book() wird beim Schließen verworfen
+        self.conn.execute("DELETE FROM offcuts WHERE id = ?", (offcut_id,))
+
+    def add(self, material, thickness, length, width, source=""):
+        self.conn.execute(
+            "INSERT INTO offcuts (material, thickness, length, width, area, source, created) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (material, thickness, length, width, length * width, source, time.time()),
+        )
+
+    def count(self, material, thickness):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM offcuts WHERE material = ? AND thickness = ?", (material, thickness)
+        ).fetchone()[0]
+
+    def clear(self, material, thickness):
+        self.conn.execute("DELETE FROM offcuts WHERE material = ? AND thickness = ?", (material, thickness))
+
+    def book(self, plate, layout, min_size, source=""):
+        # verplante Reststücke ausbuchen, neu entstandene verwertbare Reste einbuchen
+        neue = 0
+        for sheet in layout:
+            for laenge, breite in sheet_leftovers(sheet, min_size):
+                self.add(plate.name, plate.thickness, laenge, breite, source)
+                neue += 1
+        self.conn.commit()
+        return neue
+
+    def close(self):
+        self.conn.rollback()
+        self.conn.close()
+
+_orientation_items = {}
+
+def orientation_items(self, context):
+    # je Sprache einmal gebaut und gehalten, Blender braucht stabile Referenzen auf die Strings
     lang = get_lang(context) if context else 'de'
-    return tr.get(lang, tr['de']).get(label, label)
+    items = _orientation_items.get(lang)
+    if items is None:
+        items = _orientation_items[lang] = [
+            ("LONG", t("Längs", context), "", 0),
+            ("CROSS", t("Quer", context), "", 1),
+            ("ANY", t("Beliebig", context), t("Ohne Faserrichtung, Teile dürfen gedreht werden", context), 2),
+        ]
+    return items
+
+# --- Materialzuweisung nach Dicke ------------------------------------------
+
+def ensure_plate_material(plate):
+    mat_name = plate_material_name(plate)
+    mat = bpy.data.materials.get(mat_name)
+    if mat is None:
+        mat = bpy.data.materials.new(mat_name)
+        mat.use_nodes = True
+        mat.diffuse_color = (0.9, 0.85, 0.7, 1.0)
+    return mat
+
+def thickness_index(plates):
+    # nach Dicke sortiert, für bisect
+    eintraege = sorted(((plate.thickness, i) for i, plate in enumerate(plates)), key=lambda e: e[0])
+    return [e[0] for e in eintraege], [plates[e[1]] for e in eintraege]
+
+def match_plate(index, dicke, laenge, breite, tolerance):
+    dicken, plates = index
+    lo = bisect.bisect_left(dicken, dicke - tolerance)
+    hi = bisect.bisect_right(dicken, dicke + tolerance)
+    if lo == hi:
+        return None
+    # nächste Dicke zuerst, bei gleicher Dicke das erste Format, auf das das Teil passt
+    kandidaten = sorted(plates[lo:hi], key=lambda plate: abs(plate.thickness - dicke))
+    for plate in kandidaten:
+        if part_fits(plate.length, plate.width, laenge, breite, plate.orientation):
+            return plate
+    return kandidaten[0]
+
+def assign_materials(objects, zuweisung):
+    # zuweisung: obj -> Material. Mesh-Daten, die alle Nutzer gleich haben wollen,
+    # werden einmal gesetzt; abweichende Nutzer bekommen einen Objekt-Slot.
+    pro_mesh = {}
+    for obj in objects:
+        pro_mesh.setdefault(obj.data, []).append(obj)
+    geschrieben = 0
+    for mesh, nutzer in pro_mesh.items():
+        ziele = {zuweisung[obj] for obj in nutzer}
+        datenslot = all(not obj.material_slots or obj.material_slots[0].link == 'DATA' for obj in nutzer)
+        if len(ziele) == 1 and mesh.users == len(nutzer) and datenslot:
+            mat = ziele.pop()
+            if len(mesh.materials):
+                mesh.materials[0] = mat
+            else:
+                mesh.materials.append(mat)
+            for obj in nutzer:
+                if obj.active_material_index:
+                    obj.active_material_index = 0
+            geschrieben += 1
+            continue
+        for obj in nutzer:
+            if not obj.material_slots:
+                mesh.materials.append(None)
+            slot = obj.material_slots[0]
+            slot.link = 'OBJECT'
+            slot.material = zuweisung[obj]
+            if obj.active_material_index:
+                obj.active_material_index = 0
+            geschrieben += 1
+    return geschrieben
+
+# --- Plattenliste: Filter und Sortierung ---
+# Jede Änderung an der Plattenliste erhöht die Generation; die Reihenfolge der UIList
+# wird nur neu berechnet, wenn sich Generation, Anzahl oder Filtereinstellungen ändern.
+_plate_list_state = {"generation": 0}
+_plate_list_cache = {}
+
+def plates_changed(self=None, context=None):
+    _plate_list_state["generation"] += 1
+
+def plate_search_text(plate):
+    return f"{plate.name} {plate.thickness:g}mm {plate_material_name(plate)}".lower()
+
+def plate_sort_key(plate, sort_by):
+    if sort_by == 'THICKNESS':
+        return (plate.thickness, plate.length * plate.width, plate.name.lower())
+    if sort_by == 'SIZE':
+        return (plate.length * plate.width, plate.thickness, plate.name.lower())
+    return (plate.name.lower(),)
+
+@bpy.app.handlers.persistent
+def _plate_list_undo_handler(*_args):
+    # Undo/Redo ändert die Plattenliste ohne Update-Callbacks
+    plates_changed()
+
+def filter_plates(plates, suche, sort_by, reverse, invert, flag):
+    n = len(plates)
+    suche = suche.strip().lower()
+    if suche:
+        treffer = [suche in plate_search_text(plate) for plate in plates]
+        flags = [flag if gefunden != invert else 0 for gefunden in treffer]
+    else:
+        flags = [flag] * n
+    if sort_by == 'NONE':
+        return flags, []
+    order = sorted(range(n), key=lambda i: plate_sort_key(plates[i], sort_by), reverse=reverse)
+    neworder = [0] * n
+    for pos, i in enumerate(order):
+        neworder[i] = pos
+    return flags, neworder
+
+class CutlistPartProps(PropertyGroup):
+    # als bpy.types.Object.cutlist registriert
+    comment: StringProperty(name="Kommentar", default="")
+    orientation: EnumProperty(
+        name="Ausrichtung",
+        items=orientation_items,
+        default=0
+    )
+    grain_lock: BoolProperty(
+        name="Faser fix",
+        description="Teil darf beim Verschachteln nicht gedreht werden",
+        default=False
+    )
+    edge_banding: BoolVectorProperty(
+        name="Kanten",
+        description="Beschichtete Kanten: L1, L2 (Längsseiten), B1, B2 (Breitseiten)",
+        size=4,
+        default=(False, False, False, False)
+    )
+    priority: IntProperty(name="Priorität", default=0, min=0, max=100)
 
 class PlateItem(PropertyGroup):
-    name: StringProperty(name="Plattenname", default="Platte")
-    length: FloatProperty(name="Länge (mm)", default=2800.0, min=1.0)
-    width: FloatProperty(name="Breite (mm)", default=2070.0, min=1.0)
-    thickness: FloatProperty(name="Dicke (mm)", default=18.0, min=1.0)
+    name: StringProperty(name="Plattenname", default="Platte", update=plates_changed)
+    length: FloatProperty(name="Länge (mm)", default=2800.0, min=1.0, update=plates_changed)
+    width: FloatProperty(name="Breite (mm)", default=2070.0, min=1.0, update=plates_changed)
+    thickness: FloatProperty(name="Dicke (mm)", default=18.0, min=1.0, update=plates_changed)
     comment: StringProperty(name="Kommentar", default="")
+    cost: FloatProperty(name="Preis pro Platte", default=0.0, min=0.0)
     orientation: EnumProperty(
         name="Ausrichtung",
-        items=[("LONG", t("Längs"), ""), ("CROSS", t("Quer"), "")],
-        default="LONG"
+        items=orientation_items,
+        default=0
+    )
+
+class CutlistRule(PropertyGroup):
+    enabled: BoolProperty(name="Aktiv", default=True)
+    action: EnumProperty(
+        name="Aktion",
+        items=[("INCLUDE", "Nur", "Nur Objekte exportieren, die passen"), ("EXCLUDE", "Ohne", "Passende Objekte auslassen")],
+        default="EXCLUDE"
+    )
+    kind: EnumProperty(
+        name="Art",
+        items=[("COLLECTION", "Collection", "Objekt liegt (auch verschachtelt) in der Collection"),
+               ("PROPERTY", "Eigenschaft", "Benutzerdefinierte Eigenschaft hat den Wert"),
+               ("NAME", "Name (Regex)", "Objektname passt auf den regulären Ausdruck")],
+        default="COLLECTION"
     )
+    collection: PointerProperty(name="Collection", type=bpy.types.Collection)
+    prop_name: StringProperty(name="Eigenschaft", default="cut")
+    prop_value: StringProperty(name="Wert", default="1")
+    pattern: StringProperty(name="Muster", default="")
+
+def rule_label(rule):
+    if rule.kind == 'COLLECTION':
+        ziel = rule.collection.name if rule.collection else "–"
+    elif rule.kind == 'PROPERTY':
+        ziel = f"{rule.prop_name} = {rule.prop_value}"
+    else:
+        ziel = f"/{rule.pattern}/"
+    return f"{'Nur' if rule.action == 'INCLUDE' else 'Ohne'} {ziel}"
 
 class PlateSettings(PropertyGroup):
+    rules: CollectionProperty(type=CutlistRule)
+    rule_index: IntProperty(default=0)
     plates: CollectionProperty(type=PlateItem)
     plate_index: IntProperty(default=0)
     preset_name: StringProperty(name="Presetname", default="Standard")
     font_size: IntProperty(name="Schriftgröße", default=18, min=8, max=64)
+    font_path: StringProperty(
+        name="Schriftdatei",
+        description="TrueType-Schrift für das Schnittbild; leer = über fontconfig bzw. Standardschrift suchen",
+        default="",
+        subtype='FILE_PATH'
+    )
+    offcut_min: FloatProperty(name="Mindestmaß Reststück (mm)", default=300.0, min=0.0)
+    write_sidecar: BoolProperty(
+        name="Teiletabelle beim Speichern schreiben",
+        description="Legt beim Speichern <datei>.blend.cutlist.npz mit der gruppierten Teiletabelle ab",
+        default=True
+    )
 
 class CUTLIST_UL_PlateList(UIList):
     bl_idname = "CUTLIST_UL_PlateList"
+
+    sort_by: EnumProperty(
+        name="Sortieren",
+        items=[("NONE", "Keine", ""), ("NAME", "Name", ""), ("THICKNESS", "Dicke", ""), ("SIZE", "Format", "")],
+        default="NONE"
+    )
+
+    def draw_filter(self, context, layout):
+        row = layout.row(align=True)
+        row.prop(self, "filter_name", text="", icon='VIEWZOOM')
+        row.prop(self, "use_filter_invert", text="", icon='ARROW_LEFTRIGHT')
+        row = layout.row(align=True)
+        row.prop(self, "sort_by", expand=True)
+        row.prop(self, "use_filter_sort_reverse", text="", icon='SORT_DESC' if self.use_filter_sort_reverse else 'SORT_ASC')
+
+    def filter_items(self, context, data, propname):
+        plates = getattr(data, propname)
+        key = (data.as_pointer(), _plate_list_state["generation"], len(plates), self.filter_name,
+               self.sort_by, self.use_filter_sort_reverse, self.use_filter_invert)
+        cached = _plate_list_cache.get(key)
+        if cached is None:
+            cached = filter_plates(plates, self.filter_name, self.sort_by, self.use_filter_sort_reverse,
+                                   self.use_filter_invert, self.bitflag_filter_item)
+            _plate_list_cache.clear()
+            _plate_list_cache[key] = cached
+        return cached
+
     def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
         if item:
             txt = f"{item.name}: {int(item.length)}x{int(item.width)}x{int(item.thickness)}mm"
-            layout.label(text=txt, icon='MESH_GRID')
+            row = layout.row()
+            row.label(text=txt, icon='MESH_GRID')
+            est = get_sheet_estimate(item)
+            if est and est[1]:
+                row.label(text=f"≈ {est[0]}–{est[1]}" if est[0] != est[1] else f"≈ {est[0]}")
+
+class CUTLIST_UL_RuleList(UIList):
+    bl_idname = "CUTLIST_UL_RuleList"
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        row = layout.row()
+        row.prop(item, "enabled", text="")
+        ungueltig = item.kind == 'NAME' and rule_regex(item.pattern) is None
+        row.label(text=rule_label(item), icon='ERROR' if ungueltig else ('ADD' if item.action == 'INCLUDE' else 'REMOVE'))
 
 class CUTLIST_PT_PlatePanel(Panel):
     bl_label = "Platten Konfiguration"
@@ -98,7 +1985,7 @@ class CUTLIST_PT_PlatePanel(Panel):
         layout = self.layout
         platesettings = context.scene.plate_settings
         row = layout.row()
-        row.prop(context.scene, "cutlist_lang", expand=True, text=t("Sprache", context))
+        row.prop(context.scene, "cutlist_lang", expand=True, text=t("Sprache", context), translate=False)
         row = layout.row()
         row.template_list("CUTLIST_UL_PlateList", "", platesettings, "plates", platesettings, "plate_index")
         col = row.column(align=True)
@@ -106,24 +1993,92 @@ class CUTLIST_PT_PlatePanel(Panel):
         col.operator("cutlist.plate_remove", icon='REMOVE', text="")
         if platesettings.plates and platesettings.plate_index < len(platesettings.plates):
             item = platesettings.plates[platesettings.plate_index]
-            layout.prop(item, "name", text=t("Plattenname", context))
+            layout.prop(item, "name", text=t("Plattenname", context), translate=False)
             layout.prop(item, "length")
             layout.prop(item, "width")
             layout.prop(item, "thickness")
-            layout.prop(item, "comment", text=t("Kommentar", context))
-            layout.prop(item, "orientation", text=t("Ausrichtung", context))
-            layout.operator("cutlist.material_assign", text=t("Material für Platte erzeugen", context))
+            layout.prop(item, "comment", text=t("Kommentar", context), translate=False)
+            layout.prop(item, "cost", text=t("Preis pro Platte", context), translate=False)
+            layout.prop(item, "orientation", text=t("Ausrichtung", context), translate=False)
+            est = get_sheet_estimate(item)
+            if est is None:
+                layout.label(text=f"{t('Plattenbedarf (Schätzung)', context)}: {t('wird berechnet …', context)}", icon='TIME')
+            else:
+                bedarf = f"{est[0]}" if est[0] == est[1] else f"{est[0]}–{est[1]}"
+                layout.label(text=f"{t('Plattenbedarf (Schätzung)', context)}: {bedarf} {t('Platten', context)}", icon='INFO')
+            layout.operator("cutlist.material_assign", text=t("Material für Platte erzeugen", context), translate=False)
+        layout.operator("cutlist.materials_auto_assign", icon='MATERIAL', text=t("Materialien nach Dicke zuweisen", context), translate=False)
+        layout.separator()
+        row = layout.row(align=True)
+        row.prop(platesettings, "preset_name", text=t("Presetname", context), translate=False)
+        row = layout.row(align=True)
+        row.operator("cutlist.save_preset", icon='CHECKMARK', text=t("Preset speichern", context), translate=False)
+        row.operator("cutlist.load_preset", icon='IMPORT', text=t("Preset laden", context), translate=False)
         layout.separator()
+        layout.prop(platesettings, "font_size", text=t("Schriftgröße", context), translate=False)
+        layout.prop(platesettings, "font_path", text=t("Schriftdatei", context), translate=False)
+        layout.operator("export_scene.cutlist_xlsx", icon='EXPORT', text=t("Cutlist als XLSX exportieren", context), translate=False)
+        layout.operator("cutlist.export_diff", icon='FILE_REFRESH', text=t("Änderungen als XLSX exportieren", context), translate=False)
+        layout.operator("cutlist.export_variants", icon='SCENE_DATA', text=t("Varianten als XLSX exportieren", context), translate=False)
+        layout.operator("cutlist.export_pdf", icon='DOCUMENTS', text=t("Cutlist als PDF exportieren", context), translate=False)
+        layout.operator("cutlist.export_labels", icon='COPY_ID', text=t("Etiketten als PDF exportieren", context), translate=False)
+        layout.operator("cutlist.export_machine", icon='FILE_TEXT', text=t("Für Maschine/ERP exportieren", context), translate=False)
         row = layout.row(align=True)
-        row.prop(platesettings, "preset_name", text=t("Presetname", context))
+        row.operator("cutlist.nesting_image", icon='UV', text=t("Schnittbild (Nesting)", context), translate=False)
+        row.operator("cutlist.nesting_preview", icon='IMAGE_DATA', text="")
         row = layout.row(align=True)
-        row.operator("cutlist.save_preset", icon='CHECKMARK', text=t("Preset speichern", context))
-        row.operator("cutlist.load_preset", icon='IMPORT', text=t("Preset laden", context))
+        row.operator("cutlist.nesting_job_start", icon='PLAY', text=t("Optimierung als Job", context), translate=False)
+        row.operator("cutlist.nesting_job_resume", icon='RECOVER_LAST', text="")
+        if _nesting_jobs:
+            row.operator("cutlist.nesting_job_stop", icon='PAUSE', text="")
+            for job in _nesting_jobs.values():
+                layout.label(text=f"{job.plate.name}: {job.progress():.0%}, {math.ceil(job.annealer.best_score)} {t('Platten', context)}",
+                             icon='SORTTIME')
+                if job.stale:
+                    layout.label(text=t("Teile geändert, Job neu starten", context), translate=False, icon='ERROR')
+        for job in _finished_jobs.values():
+            layout.label(text=f"{job.plate.name}: {t('fertig', context)}, {math.ceil(job.annealer.best_score)} {t('Platten', context)}",
+                         icon='CHECKMARK')
         layout.separator()
-        layout.prop(platesettings, "font_size", text=t("Schriftgröße", context))
-        layout.operator("export_scene.cutlist_xlsx", icon='EXPORT', text=t("Cutlist als XLSX exportieren", context))
-        layout.operator("cutlist.export_pdf", icon='DOCUMENTS', text=t("Cutlist als PDF exportieren", context))
-        layout.operator("cutlist.nesting_image", icon='UV', text=t("Schnittbild (Nesting)", context))
+        layout.prop(platesettings, "offcut_min", text=t("Mindestmaß Reststück (mm)", context), translate=False)
+        row = layout.row(align=True)
+        row.operator("cutlist.offcut_add", icon='ADD', text=t("Reststück einlagern", context), translate=False)
+        row.operator("cutlist.offcut_clear", icon='TRASH', text="")
+        layout.prop(platesettings, "write_sidecar", text=t("Teiletabelle beim Speichern schreiben", context), translate=False)
+        box = layout.box()
+        box.label(text=t("Auswahlregeln", context), translate=False, icon='FILTER')
+        row = box.row()
+        row.template_list("CUTLIST_UL_RuleList", "", platesettings, "rules", platesettings, "rule_index", rows=2)
+        col = row.column(align=True)
+        col.operator("cutlist.rule_add", icon='ADD', text="")
+        col.operator("cutlist.rule_remove", icon='REMOVE', text="")
+        if platesettings.rules and platesettings.rule_index < len(platesettings.rules):
+            rule = platesettings.rules[platesettings.rule_index]
+            row = box.row(align=True)
+            row.prop(rule, "action", expand=True)
+            box.prop(rule, "kind", text="")
+            if rule.kind == 'COLLECTION':
+                box.prop(rule, "collection", text="")
+            elif rule.kind == 'PROPERTY':
+                row = box.row(align=True)
+                row.prop(rule, "prop_name", text="")
+                row.prop(rule, "prop_value", text="")
+            else:
+                box.prop(rule, "pattern", text="", icon='ERROR' if rule_regex(rule.pattern) is None else 'NONE')
+        obj = context.active_object
+        if obj is not None and obj.type == 'MESH':
+            box = layout.box()
+            box.label(text=f"{t('Teil', context)}: {obj.name}", icon='MESH_CUBE')
+            box.prop(obj.cutlist, "comment", text=t("Kommentar", context), translate=False)
+            box.prop(obj.cutlist, "orientation", text=t("Ausrichtung", context), translate=False)
+            box.prop(obj.cutlist, "grain_lock", text=t("Faser fix", context), translate=False)
+            row = box.row(align=True)
+            for i, kante in enumerate(("L1", "L2", "B1", "B2")):
+                row.prop(obj.cutlist, "edge_banding", index=i, text=kante, toggle=True)
+            box.prop(obj.cutlist, "priority", text=t("Priorität", context), translate=False)
+            row = box.row(align=True)
+            row.operator("cutlist.set_part_props", icon='PROPERTIES', text=t("Für Auswahl setzen", context), translate=False)
+            row.operator("cutlist.copy_part_props", icon='PASTEDOWN', text=t("Auf Auswahl übertragen", context), translate=False)
 
 class CUTLIST_OT_PlateAdd(Operator):
     bl_idname = "cutlist.plate_add"
@@ -133,6 +2088,7 @@ class CUTLIST_OT_PlateAdd(Operator):
         new = platesettings.plates.add()
         new.name = f"Platte {len(platesettings.plates)}"
         platesettings.plate_index = len(platesettings.plates)-1
+        plates_changed()
         return {'FINISHED'}
 
 class CUTLIST_OT_PlateRemove(Operator):
@@ -144,6 +2100,100 @@ class CUTLIST_OT_PlateRemove(Operator):
         if platesettings.plates and idx < len(platesettings.plates):
             platesettings.plates.remove(idx)
             platesettings.plate_index = max(0, idx-1)
+            plates_changed()
+        return {'FINISHED'}
+
+PART_PROP_NAMES = ("comment", "orientation", "grain_lock", "edge_banding", "priority")
+
+def set_part_props(objects, werte):
+    # werte: [(Eigenschaft, Wert)]; nur tatsächlich abweichende Werte schreiben
+    geaendert = 0
+    for obj in objects:
+        props = obj.cutlist
+        for name, wert in werte:
+            if name == "edge_banding":
+                if tuple(props.edge_banding) == wert:
+                    continue
+            elif getattr(props, name) == wert:
+                continue
+            setattr(props, name, wert)
+            geaendert += 1
+    return geaendert
+
+class CUTLIST_OT_SetPartProps(Operator):
+    bl_idname = "cutlist.set_part_props"
+    bl_label = "Teileigenschaften für Auswahl setzen"
+    bl_description = "Setzt die angehakten Cutlist-Eigenschaften für alle ausgewählten Mesh-Objekte"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    use_comment: BoolProperty(name="Kommentar setzen", default=False)
+    comment: StringProperty(name="Kommentar", default="")
+    use_orientation: BoolProperty(name="Ausrichtung setzen", default=False)
+    orientation: EnumProperty(name="Ausrichtung", items=orientation_items, default=0)
+    use_grain_lock: BoolProperty(name="Faser fix setzen", default=False)
+    grain_lock: BoolProperty(name="Faser fix", default=False)
+    use_edge_banding: BoolProperty(name="Kanten setzen", default=False)
+    edge_banding: BoolVectorProperty(name="Kanten", size=4, default=(False, False, False, False))
+    use_priority: BoolProperty(name="Priorität setzen", default=False)
+    priority: IntProperty(name="Priorität", default=0, min=0, max=100)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        layout = self.layout
+        for name in PART_PROP_NAMES:
+            row = layout.row()
+            row.prop(self, "use_" + name, text="")
+            sub = row.row()
+            sub.enabled = getattr(self, "use_" + name)
+            sub.prop(self, name)
+
+    def execute(self, context):
+        werte = [(name, tuple(self.edge_banding) if name == "edge_banding" else getattr(self, name))
+                 for name in PART_PROP_NAMES if getattr(self, "use_" + name)]
+        objects = [o for o in context.selected_objects if o.type == 'MESH']
+        if not werte or not objects:
+            self.report({'WARNING'}, "Keine Eigenschaft gewählt oder keine Mesh-Objekte ausgewählt.")
+            return {'CANCELLED'}
+        geaendert = set_part_props(objects, werte)
+        self.report({'INFO'}, f"{len(objects)} Teile bearbeitet ({geaendert} Werte geändert).")
+        return {'FINISHED'}
+
+class CUTLIST_OT_CopyPartProps(Operator):
+    bl_idname = "cutlist.copy_part_props"
+    bl_label = "Teileigenschaften auf Auswahl übertragen"
+    bl_description = "Überträgt alle Cutlist-Eigenschaften des aktiven Objekts auf die übrigen ausgewählten Mesh-Objekte"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        quelle = context.active_object
+        if quelle is None or quelle.type != 'MESH':
+            return {'CANCELLED'}
+        werte = list(zip(PART_PROP_NAMES, part_props(quelle)))
+        objects = [o for o in context.selected_objects if o.type == 'MESH' and o != quelle]
+        geaendert = set_part_props(objects, werte)
+        self.report({'INFO'}, f"Eigenschaften von {quelle.name} auf {len(objects)} Teile übertragen ({geaendert} Werte geändert).")
+        return {'FINISHED'}
+
+class CUTLIST_OT_RuleAdd(Operator):
+    bl_idname = "cutlist.rule_add"
+    bl_label = "Auswahlregel hinzufügen"
+    def execute(self, context):
+        settings = context.scene.plate_settings
+        settings.rules.add()
+        settings.rule_index = len(settings.rules) - 1
+        return {'FINISHED'}
+
+class CUTLIST_OT_RuleRemove(Operator):
+    bl_idname = "cutlist.rule_remove"
+    bl_label = "Auswahlregel entfernen"
+    def execute(self, context):
+        settings = context.scene.plate_settings
+        idx = settings.rule_index
+        if idx < len(settings.rules):
+            settings.rules.remove(idx)
+            settings.rule_index = max(0, idx - 1)
         return {'FINISHED'}
 
 class CUTLIST_OT_MaterialAssign(Operator):
@@ -153,13 +2203,62 @@ class CUTLIST_OT_MaterialAssign(Operator):
         platesettings = context.scene.plate_settings
         idx = platesettings.plate_index
         if idx < len(platesettings.plates):
-            plate = platesettings.plates[idx]
-            mat_name = f"{plate.name}_{int(plate.thickness)}mm_{int(plate.length)}x{int(plate.width)}"
-            if mat_name not in bpy.data.materials:
-                mat = bpy.data.materials.new(mat_name)
-                mat.use_nodes = True
-                mat.diffuse_color = (0.9, 0.85, 0.7, 1.0)
-            self.report({'INFO'}, f"Material '{mat_name}' erstellt!")
+            mat = ensure_plate_material(platesettings.plates[idx])
+            self.report({'INFO'}, f"Material '{mat.name}' erstellt!")
+        return {'FINISHED'}
+
+class CUTLIST_OT_MaterialsAutoAssign(Operator):
+    bl_idname = "cutlist.materials_auto_assign"
+    bl_label = "Materialien für alle Platten erzeugen und zuweisen"
+    bl_description = "Legt für jede Platte ein Material an und weist jedem Teil die Platte mit passender Dicke zu"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    tolerance: FloatProperty(name="Toleranz Dicke (mm)", default=0.5, min=0.0)
+    export_all: BoolProperty(
+        name="Alle Objekte",
+        description="Alle Mesh-Objekte der Szene (statt nur selektierte)",
+        default=True
+    )
+    export_sketch: BoolProperty(
+        name="Sketch-Objekte einbeziehen",
+        description="Auch Objekte, die 'Sketch' im Namen haben",
+        default=False
+    )
+    overwrite: BoolProperty(
+        name="Vorhandene Plattenmaterialien ersetzen",
+        description="Auch Teile umstellen, die bereits ein Plattenmaterial haben",
+        default=False
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        plates = list(context.scene.plate_settings.plates)
+        if not plates:
+            self.report({'WARNING'}, "Keine Platten angelegt.")
+            return {'CANCELLED'}
+        materialien = {plate_material_name(plate): ensure_plate_material(plate) for plate in plates}
+        index = thickness_index(plates)
+        zuweisung, ohne = {}, {}
+        # Teile aus Collection-Instanzen gehören den Quellobjekten, die bleiben unverändert
+        for obj in collect_objects(context, self.export_all, self.export_sketch, expand_instances=False):
+            laenge, breite, dicke, mat_name = measure_object(obj)
+            if mat_name in materialien and not self.overwrite:
+                continue
+            plate = match_plate(index, dicke, laenge, breite, self.tolerance)
+            if plate is None:
+                ohne[dicke] = ohne.get(dicke, 0) + 1
+                continue
+            mat = materialien[plate_material_name(plate)]
+            if mat_name != mat.name:
+                zuweisung[obj] = mat
+        geschrieben = assign_materials(list(zuweisung), zuweisung)
+        request_sheet_estimate(full=True)
+        self.report({'INFO'}, f"{len(materialien)} Materialien, {len(zuweisung)} Teile zugewiesen ({geschrieben} Schreibvorgänge).")
+        if ohne:
+            dicken = ", ".join(f"{d:g} mm ({n}x)" for d, n in sorted(ohne.items(), key=lambda e: -e[1])[:5])
+            self.report({'WARNING'}, f"{sum(ohne.values())} Teile ohne passende Platte: {dicken}")
         return {'FINISHED'}
 
 class CUTLIST_OT_SavePreset(Operator):
@@ -176,6 +2275,7 @@ class CUTLIST_OT_SavePreset(Operator):
                 "thickness": plate.thickness,
                 "comment": plate.comment,
                 "orientation": plate.orientation,
+                "cost": plate.cost,
             })
         preset_path = bpy.utils.resource_path('USER') + f"/cutlist_{settings.preset_name}.json"
         with open(preset_path, "w", encoding='utf-8') as fp:
@@ -201,12 +2301,34 @@ class CUTLIST_OT_LoadPreset(Operator):
                 new.thickness = p["thickness"]
                 new.comment = p.get("comment", "")
                 new.orientation = p.get("orientation", "LONG")
+                new.cost = p.get("cost", 0.0)
             settings.plate_index = 0
+            plates_changed()
             self.report({'INFO'}, f"Preset geladen: {preset_path}")
         else:
             self.report({'WARNING'}, "Preset existiert nicht!")
         return {'FINISHED'}
 
+CUTLIST_HEADERS = [
+    'Beispielname', 'Länge (mm)', 'Breite (mm)', 'Dicke (mm)', 'Collection',
+    'Plattenmaterial', 'Stückzahl', 'Kommentar', 'Ausrichtung', 'Faser fix', 'Kanten', 'Priorität', 'Code'
+]
+
+def cutlist_table(parts_grouped):
+    return [
+        [p["name"], p["laenge"], p["breite"], p["dicke"], p["col_name"], p["mat_name"], p["stueckzahl"], p["comment"], p["orientation"],
+         "ja" if p["grain_lock"] else "", edge_label(p["kanten"]), p["priority"], part_code(p)]
+        for p in parts_grouped.values()
+    ]
+
+def autosize_columns(ws):
+    for col_idx in range(1, ws.max_column+1):
+        max_len = 0
+        for cell in ws[get_column_letter(col_idx)]:
+            if cell.value:
+                max_len = max(max_len, len(str(cell.value)))
+        ws.column_dimensions[get_column_letter(col_idx)].width = max_len + 2
+
 class ExportCutlistXLSXOperator(bpy.types.Operator, ExportHelper):
     bl_idname = "export_scene.cutlist_xlsx"
     bl_label = "Export Cutlist als XLSX"
@@ -222,11 +2344,29 @@ class ExportCutlistXLSXOperator(bpy.types.Operator, ExportHelper):
         description="Exportiere Objekte, die 'Sketch' im Namen haben",
         default=False
     )
+    export_cuts: BoolProperty(
+        name="Schnittfolge exportieren",
+        description="Teile je Platte verschachteln und die Guillotine-Schnittfolge als eigenes Blatt ausgeben",
+        default=True
+    )
+    export_hierarchy: BoolProperty(
+        name="Collection-Hierarchie",
+        description="Teile, Fläche und Plattenbedarf je Ebene der Collection-Hierarchie als eigenes Blatt",
+        default=True
+    )
+    export_costing: BoolProperty(
+        name="Kosten und Verschnitt",
+        description="Teilefläche, Verschnitt, Kantenlänge und Materialkosten je Platte als eigenes Blatt",
+        default=True
+    )
 
     def draw(self, context):
         layout = self.layout
         layout.prop(self, "export_all")
         layout.prop(self, "export_sketch")
+        layout.prop(self, "export_cuts")
+        layout.prop(self, "export_hierarchy")
+        layout.prop(self, "export_costing")
 
     def execute(self, context):
         settings = context.scene.plate_settings
@@ -234,94 +2374,550 @@ class ExportCutlistXLSXOperator(bpy.types.Operator, ExportHelper):
         ws = wb.active
         ws.title = "Cutlist"
         ws.append(['PLATTENBEDARF'])
-        ws.append(['Dicke (mm)', 'Plattenname', 'Format (mm)', 'Benötigte Platten'])
+        ws.append(['Dicke (mm)', 'Plattenname', 'Format (mm)', 'Benötigte Platten', 'Kosten'])
 
-        if self.export_all:
-            objects = [o for o in bpy.context.scene.objects if o.type == 'MESH']
-        else:
-            objects = [o for o in bpy.context.selected_objects if o.type == 'MESH']
-        if not self.export_sketch:
-            objects = [o for o in objects if "sketch" not in o.name.lower()]
-
-        parts_grouped = {}
-        for obj in objects:
-            dims = sorted([obj.dimensions.x, obj.dimensions.y, obj.dimensions.z], reverse=True)
-            laenge = round(dims[0],2)
-            breite = round(dims[1],2)
-            dicke = round(dims[2],2)
-            mat_name = obj.active_material.name if getattr(obj, "active_material", None) else ""
-            key = (laenge, breite, dicke, mat_name)
-            comment = getattr(obj, "comment", "")
-            orientation = getattr(obj, "orientation", "LONG")
-            if key not in parts_grouped:
-                col_name = obj.users_collection[0].name if getattr(obj, "users_collection", []) else 'None'
-                parts_grouped[key] = {
-                    "name": obj.name,
-                    "laenge": laenge,
-                    "breite": breite,
-                    "dicke": dicke,
-                    "col_name": col_name,
-                    "mat_name": mat_name,
-                    "stueckzahl": 1,
-                    "comment": comment,
-                    "orientation": orientation,
-                }
-            else:
-                parts_grouped[key]["stueckzahl"] += 1
+        objects = collect_objects(context, self.export_all, self.export_sketch)
+        parts_grouped = group_parts(objects)
 
-        headers = [
-            'Beispielname', 'Länge (mm)', 'Breite (mm)', 'Dicke (mm)', 'Collection',
-            'Plattenmaterial', 'Stückzahl', 'Kommentar', 'Ausrichtung'
-        ]
-        cutlist_rows = [
-            [p["name"], p["laenge"], p["breite"], p["dicke"], p["col_name"], p["mat_name"], p["stueckzahl"], p["comment"], p["orientation"]]
-            for p in parts_grouped.values()
-        ]
+        headers = CUTLIST_HEADERS
+        cutlist_rows = cutlist_table(parts_grouped)
 
         plates = [p for p in context.scene.plate_settings.plates]
 
-        for plate in plates:
-            platemat = f"{plate.name}_{int(plate.thickness)}mm_{int(plate.length)}x{int(plate.width)}"
-            benoetigte_platten = 0
-            for row in cutlist_rows:
-                if row[5] == platemat:
-                    teil_l = row[1]
-                    teil_b = row[2]
-                    qty = row[6]
-                    # Nur Orientierung – nicht drehen!
-                    if plate.orientation == "CROSS":
-                        n_l = int((plate.length + SAW_KERF) // (teil_b + SAW_KERF))
-                        n_b = int((plate.width + SAW_KERF) // (teil_l + SAW_KERF))
-                    else:  # LONG
-                        n_l = int((plate.length + SAW_KERF) // (teil_l + SAW_KERF))
-                        n_b = int((plate.width + SAW_KERF) // (teil_b + SAW_KERF))
-                    pro_platte = n_l * n_b
-                    if pro_platte < 1:
-                        pro_platte = 1
-                    benoetigte_platten += math.ceil(qty / pro_platte)
+        bedarf, warnungen = sheet_demand(plates, parts_grouped)
+        for warnung in warnungen:
+            self.report({'WARNING'}, warnung)
+        for plate, benoetigte_platten in bedarf:
             if benoetigte_platten > 0:
-                ws.append([plate.thickness, plate.name, f"{int(plate.length)} x {int(plate.width)}", benoetigte_platten])
+                kosten = benoetigte_platten * plate.cost if plate.cost > 0 else None
+                ws.append([plate.thickness, plate.name, f"{int(plate.length)} x {int(plate.width)}", benoetigte_platten, kosten])
 
         ws.append([])
         ws.append(['CUTLIST'])
         ws.append(headers)
         for row in cutlist_rows:
             ws.append(row)
-        for col_idx in range(1, ws.max_column+1):
-            max_len = 0
-            for cell in ws[get_column_letter(col_idx)]:
-                if cell.value:
-                    max_len = max(max_len, len(str(cell.value)))
-            ws.column_dimensions[get_column_letter(col_idx)].width = max_len + 2
+        autosize_columns(ws)
+        plate_layouts = []
+        if self.export_cuts:
+            gesperrt = {p["name"] for p in parts_grouped.values() if p["grain_lock"]}
+            for plate in plates:
+                platemat = plate_material_name(plate)
+                teile = [(int(p["laenge"]), int(p["breite"]), p["name"]) for p in parts_grouped.values()
+                         if p["mat_name"] == platemat for _ in range(p["stueckzahl"])]
+                teile, zu_gross = split_oversize(plate, teile, gesperrt)
+                if zu_gross:
+                    namen = ", ".join(p[2] for p in zu_gross[:5]) + (" …" if len(zu_gross) > 5 else "")
+                    self.report({'WARNING'}, f"{plate.name}: {len(zu_gross)} Teile größer als die Platte, "
+                                             f"fehlen in Schnittfolge und Kosten: {namen}")
+                if teile:
+                    try:
+                        plate_layouts.append((plate, nest_parts(plate, teile)))
+                    except ValueError as e:
+                        self.report({'WARNING'}, f"{plate.name}: {e}")
+            write_cut_sheet(wb, plate_layouts)
+        if self.export_hierarchy:
+            write_hierarchy_sheet(wb, collection_report(context.scene, objects, plates))
+        if self.export_costing:
+            write_costing_sheet(wb, yield_analytics(parts_grouped, bedarf, plate_layouts))
         wb.save(self.filepath)
+        store_fingerprint(context.scene, make_fingerprint(parts_grouped, bedarf))
         self.report({'INFO'}, "Cutlist als XLSX (nur Orientation, keine Drehung) exportiert.")
         return {'FINISHED'}
 
+# --- Kosten und Ausbeute -------------------------------------------------------
+# Ein NumPy-Durchlauf über die Teilegruppen: Flächen und Kantenlängen werden
+# per bincount auf die Plattengruppen (Name + Dicke, wie beim Plattenbedarf)
+# verteilt. Plattenfläche und Kosten kommen aus dem Schnittbild, falls
+# vorhanden, sonst aus dem gezählten Plattenbedarf.
+
+COSTING_HEADERS = ['Plattenname', 'Dicke (mm)', 'Teile', 'Teilefläche (m²)', 'Plattenfläche (m²)',
+                   'Platten', 'Verschnitt (%)', 'Kantenlänge (m)', 'Materialkosten', 'Kosten pro m² Teil']
+
+def yield_analytics(parts_grouped, bedarf, plate_layouts=None):
+    gruppen = list(stock_groups([plate for plate, _anzahl in bedarf]).items())
+    gruppe_von = {}
+    for i, (_key, gruppe) in enumerate(gruppen):
+        for plate in gruppe:
+            gruppe_von[plate_material_name(plate)] = i
+    n_gruppen = len(gruppen)
+    werte = np.array([(p["laenge"], p["breite"], p["stueckzahl"], gruppe_von.get(p["mat_name"], n_gruppen)) + tuple(p["kanten"])
+                      for p in parts_grouped.values()], dtype=np.float64).reshape(-1, 8)
+    laenge, breite, stueck, idx = werte[:, 0], werte[:, 1], werte[:, 2], werte[:, 3].astype(np.int64)
+    # Kantenlänge nur für die als beschichtet markierten Kanten (L1, L2, B1, B2)
+    kante = (laenge * (werte[:, 4] + werte[:, 5]) + breite * (werte[:, 6] + werte[:, 7])) * stueck
+    teile = np.bincount(idx, weights=stueck, minlength=n_gruppen + 1)[:n_gruppen]
+    flaeche = np.bincount(idx, weights=laenge * breite * stueck, minlength=n_gruppen + 1)[:n_gruppen] / 1e6
+    kanten = np.bincount(idx, weights=kante, minlength=n_gruppen + 1)[:n_gruppen] / 1e3
+
+    platten = np.zeros(n_gruppen)
+    platten_flaeche = np.zeros(n_gruppen)
+    kosten = np.zeros(n_gruppen)
+    if plate_layouts:
+        for plate, layout in plate_layouts:
+            i = gruppe_von[plate_material_name(plate)]
+            neu = [sheet for sheet in layout if sheet["offcut_id"] is None]
+            platten[i] += len(neu)
+            platten_flaeche[i] += sum(sheet["length"] * sheet["width"] for sheet in layout) / 1e6
+            kosten[i] += len(neu) * plate.cost
+    else:
+        for plate, anzahl in bedarf:
+            i = gruppe_von[plate_material_name(plate)]
+            platten[i] += anzahl
+            platten_flaeche[i] += anzahl * plate.length * plate.width / 1e6
+            kosten[i] += anzahl * plate.cost
+    # Gruppen mit nur teilweise bepreisten Formaten: keine Kosten statt zu niedriger (wie stock_costs)
+    unvollstaendig = np.array([stock_costs(gruppe)[1] is not None for _key, gruppe in gruppen], dtype=bool).reshape(-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        verschnitt = np.where(platten_flaeche > 0, 100.0 * (1.0 - flaeche / platten_flaeche), 0.0)
+        pro_m2 = np.where(flaeche > 0, kosten / flaeche, 0.0)
+
+    zeilen = []
+    for i, ((name, dicke), _gruppe) in enumerate(gruppen):
+        if not teile[i] and not platten[i]:
+            continue
+        zeilen.append([name, dicke, int(teile[i]), round(float(flaeche[i]), 3), round(float(platten_flaeche[i]), 3),
+                       int(platten[i]), round(float(verschnitt[i]), 1), round(float(kanten[i]), 2),
+                       *((round(float(kosten[i]), 2), round(float(pro_m2[i]), 2)) if kosten[i] and not unvollstaendig[i] else (None, None))])
+    # Summe nur über die Plattengruppen; Teile ohne Platte folgen als eigene Zeile
+    gesamt_flaeche, gesamt_platten_flaeche = float(flaeche.sum()), float(platten_flaeche.sum())
+    zeilen.append(["Summe", None, int(teile.sum()), round(gesamt_flaeche, 3), round(gesamt_platten_flaeche, 3),
+                   int(platten.sum()),
+                   round(100.0 * (1.0 - gesamt_flaeche / gesamt_platten_flaeche), 1) if gesamt_platten_flaeche else None,
+                   round(float(kanten.sum()), 2),
+                   round(float(kosten.sum()), 2) if kosten.any() and not unvollstaendig.any() else None, None])
+    ohne_platte = idx == n_gruppen
+    if ohne_platte.any():
+        zeilen.append(["(ohne Platte)", None, int(stueck[ohne_platte].sum()),
+                       round(float((laenge * breite * stueck)[ohne_platte].sum()) / 1e6, 3), None, None, None,
+                       round(float(kante[ohne_platte].sum()) / 1e3, 2), None, None])
+    return zeilen
+
+def write_costing_sheet(wb, zeilen):
+    ws = wb.create_sheet("Kosten")
+    ws.append(COSTING_HEADERS)
+    for zeile in zeilen:
+        ws.append(zeile)
+    autosize_columns(ws)
+    return ws
+
+# --- Varianten: mehrere Szenen / View Layer in einem Export ----------------
+# Jedes Objekt wird nur einmal gemessen, auch wenn es in mehreren Szenen
+# verlinkt ist. Der Gesamtbedarf wird über alle Varianten zusammen
+# verschachtelt, nicht aus den Einzelbedarfen aufsummiert.
+
+class CutlistVariantItem(PropertyGroup):
+    name: StringProperty()
+    scene: StringProperty()
+    use: BoolProperty(name="", default=True)
+
+def variant_sources(mode, scene):
+    # -> [(Variantenname, Szenenname, Objekte)]
+    if mode == 'SCENES':
+        return [(sc.name, sc.name, sc.objects) for sc in bpy.data.scenes]
+    return [(vl.name, scene.name, vl.objects) for vl in scene.view_layers]
+
+def merge_groups(gruppen):
+    gesamt = {}
+    for parts_grouped in gruppen:
+        for key, p in parts_grouped.items():
+            if key in gesamt:
+                gesamt[key]["stueckzahl"] += p["stueckzahl"]
+            else:
+                gesamt[key] = dict(p)
+    return gesamt
+
+def sheet_title(name, vergeben):
+    titel = "".join("_" if c in '[]:*?/\\' else c for c in name)[:31] or "Variante"
+    basis, n = titel, 2
+    while titel.lower() in vergeben:
+        suffix = f" ({n})"
+        titel = basis[:31 - len(suffix)] + suffix
+        n += 1
+    vergeben.add(titel.lower())
+    return titel
+
+class CUTLIST_OT_ExportVariants(Operator, ExportHelper):
+    bl_idname = "cutlist.export_variants"
+    bl_label = "Varianten als XLSX exportieren"
+    bl_description = "Mehrere Szenen oder View Layer in eine Arbeitsmappe mit gemeinsamem Plattenbedarf exportieren"
+    filename_ext = ".xlsx"
+
+    mode: EnumProperty(
+        name="Varianten",
+        items=[("SCENES", "Szenen", "Jede Szene ist eine Variante"),
+               ("VIEW_LAYERS", "View Layer", "Jeder View Layer der aktuellen Szene ist eine Variante")],
+        default="SCENES",
+        update=lambda self, context: self.fill_variants(context)
+    )
+    variants: CollectionProperty(type=CutlistVariantItem)
+    export_sketch: BoolProperty(
+        name="Sketch-Objekte exportieren",
+        description="Exportiere Objekte, die 'Sketch' im Namen haben",
+        default=False
+    )
+
+    def fill_variants(self, context):
+        self.variants.clear()
+        for name, scene_name, _objects in variant_sources(self.mode, context.scene):
+            item = self.variants.add()
+            item.name = name
+            item.scene = scene_name
+
+    def invoke(self, context, event):
+        self.fill_variants(context)
+        return ExportHelper.invoke(self, context, event)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "mode", expand=True)
+        for item in self.variants:
+            layout.prop(item, "use", text=item.name)
+        layout.prop(self, "export_sketch")
+
+    def execute(self, context):
+        if not self.variants:
+            self.fill_variants(context)
+        gewaehlt = {item.name for item in self.variants if item.use}
+        plates = list(context.scene.plate_settings.plates)
+        messungen = {}
+        varianten = []
+        regel = compile_rules(context.scene.plate_settings.rules)
+        for name, _scene_name, objects in variant_sources(self.mode, context.scene):
+            if name in gewaehlt:
+                varianten.append((name, group_parts(filter_objects(objects, self.export_sketch, regel), messungen)))
+        if not varianten:
+            self.report({'WARNING'}, "Keine Variante ausgewählt.")
+            return {'CANCELLED'}
+
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Gesamtbedarf"
+        ws.append(['PLATTENBEDARF'])
+        ws.append(['Dicke (mm)', 'Plattenname', 'Format (mm)'] + [name for name, _ in varianten] + ['Gesamt', 'Kosten'])
+        einzeln = []
+        for _name, parts_grouped in varianten:
+            bedarf, warnungen = sheet_demand(plates, parts_grouped)
+            einzeln.append(dict(bedarf))
+            for warnung in warnungen:
+                self.report({'WARNING'}, warnung)
+        gesamt, _warnungen = sheet_demand(plates, merge_groups(pg for _, pg in varianten))
+        for plate, anzahl in gesamt:
+            je_variante = [bedarf.get(plate, 0) for bedarf in einzeln]
+            if anzahl or any(je_variante):
+                kosten = anzahl * plate.cost if plate.cost > 0 else None
+                ws.append([plate.thickness, plate.name, f"{int(plate.length)} x {int(plate.width)}"] + je_variante + [anzahl, kosten])
+        autosize_columns(ws)
+
+        vergeben = {ws.title.lower()}
+        for name, parts_grouped in varianten:
+            ws = wb.create_sheet(sheet_title(name, vergeben))
+            ws.append(CUTLIST_HEADERS)
+            for row in cutlist_table(parts_grouped):
+                ws.append(row)
+            autosize_columns(ws)
+        wb.save(self.filepath)
+        self.report({'INFO'}, f"{len(varianten)} Varianten exportiert, {len(messungen)} Objekte gemessen.")
+        return {'FINISHED'}
+
+# --- Bericht nach Collection-Hierarchie --------------------------------------
+# Ein Durchlauf: Teile werden ihrer (ersten) Collection zugeschlagen, danach
+# werden die Summen in umgekehrter Preorder-Reihenfolge einmal an die Eltern
+# weitergereicht. Der Plattenbedarf je Ebene ist die Rasterzählung
+# (Teile / Teile pro Platte) aufsummiert und erst auf der Ebene aufgerundet.
+
+def collection_report(scene, objects, plates):
+    platten = {plate_material_name(p): p for p in plates}
+    wurzel = scene.collection
+    reihenfolge, eltern, tiefe = [], {}, {}
+    stapel = [(wurzel, None, 0)]
+    while stapel:
+        coll, parent, ebene = stapel.pop()
+        if coll.name in tiefe:
+            continue  # in mehreren Eltern verlinkte Collection nur einmal zählen
+        reihenfolge.append(coll.name)
+        eltern[coll.name] = parent
+        tiefe[coll.name] = ebene
+        for child in reversed(coll.children[:]):
+            stapel.append((child, coll.name, ebene + 1))
+    knoten = {name: {"teile": 0, "flaeche": 0.0, "bedarf": {}} for name in reihenfolge}
+    for obj in objects:
+        laenge, breite, _dicke, mat_name = measure_object(obj)
+        col_name = obj.users_collection[0].name if obj.users_collection else wurzel.name
+        k = knoten.get(col_name) or knoten[wurzel.name]
+        k["teile"] += 1
+        k["flaeche"] += laenge * breite / 1e6
+        plate = platten.get(mat_name)
+        if plate is not None:
+            k["bedarf"][mat_name] = k["bedarf"].get(mat_name, 0.0) + 1.0 / teile_pro_platte(plate, laenge, breite)
+    for name in reversed(reihenfolge):
+        parent = eltern[name]
+        if parent is None:
+            continue
+        k, p = knoten[name], knoten[parent]
+        p["teile"] += k["teile"]
+        p["flaeche"] += k["flaeche"]
+        for mat_name, anteil in k["bedarf"].items():
+            p["bedarf"][mat_name] = p["bedarf"].get(mat_name, 0.0) + anteil
+    zeilen = []
+    for name in reihenfolge:
+        k = knoten[name]
+        if not k["teile"]:
+            continue
+        bedarf = {mat_name: math.ceil(anteil - 1e-9) for mat_name, anteil in k["bedarf"].items()}
+        zeilen.append({"name": name, "ebene": tiefe[name], "teile": k["teile"],
+                       "flaeche": round(k["flaeche"], 3), "platten": sum(bedarf.values()), "bedarf": bedarf})
+    return zeilen
+
+HIERARCHY_HEADERS = ['Collection', 'Teile', 'Fläche (m²)', 'Platten', 'Platten je Material']
+
+def hierarchy_row(zeile):
+    detail = "; ".join(f"{mat}: {n}" for mat, n in sorted(zeile["bedarf"].items()))
+    return ["  " * zeile["ebene"] + zeile["name"], zeile["teile"], zeile["flaeche"], zeile["platten"], detail]
+
+def write_hierarchy_sheet(wb, zeilen):
+    ws = wb.create_sheet("Collections")
+    ws.append(HIERARCHY_HEADERS)
+    ws.sheet_properties.outlinePr.summaryBelow = False
+    for zeile in zeilen:
+        ws.append(hierarchy_row(zeile))
+        if zeile["ebene"]:
+            ws.row_dimensions[ws.max_row].outline_level = min(zeile["ebene"], 7)
+    ws.column_dimensions['A'].width = 40
+    ws.column_dimensions['E'].width = 60
+    return ws
+
+# --- Änderungsexport ---------------------------------------------------------
+# Nach jedem XLSX-Export wird ein Fingerabdruck der Gruppen (Hash des
+# Gruppenschlüssels -> Stückzahl + Anzeigedaten) und des Plattenbedarfs als
+# JSON in der Szene gespeichert. Der Vergleich ist ein Dict-Abgleich über die
+# Hashes und damit linear in der Zahl der Gruppen.
+
+FINGERPRINT_PROP = "cutlist_fingerprint"
+
+def group_hash(key):
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).hexdigest()
+
+def make_fingerprint(parts_grouped, bedarf):
+    return {
+        "version": 1,
+        "gruppen": {
+            group_hash(key): [p["stueckzahl"], p["name"], p["laenge"], p["breite"], p["dicke"], p["mat_name"]]
+            for key, p in parts_grouped.items()
+        },
+        "bedarf": {plate_material_name(plate): anzahl for plate, anzahl in bedarf},
+    }
+
+def load_fingerprint(scene):
+    try:
+        return json.loads(scene.get(FINGERPRINT_PROP, ""))
+    except ValueError:
+        return None
+
+def store_fingerprint(scene, fingerprint):
+    scene[FINGERPRINT_PROP] = json.dumps(fingerprint, separators=(",", ":"))
+
+def diff_fingerprints(alt, neu):
+    # -> Zeilen (Status, Name, L, B, D, Material, alt, neu, Differenz)
+    zeilen = []
+    alt_gruppen, neu_gruppen = alt["gruppen"], neu["gruppen"]
+    for h, (qty, name, laenge, breite, dicke, mat_name) in neu_gruppen.items():
+        vorher = alt_gruppen.get(h)
+        if vorher is None:
+            zeilen.append(["neu", name, laenge, breite, dicke, mat_name, 0, qty, qty])
+        elif vorher[0] != qty:
+            zeilen.append(["geändert", name, laenge, breite, dicke, mat_name, vorher[0], qty, qty - vorher[0]])
+    for h, (qty, name, laenge, breite, dicke, mat_name) in alt_gruppen.items():
+        if h not in neu_gruppen:
+            zeilen.append(["entfallen", name, laenge, breite, dicke, mat_name, qty, 0, -qty])
+    return zeilen
+
+class CUTLIST_OT_ExportDiff(Operator, ExportHelper):
+    bl_idname = "cutlist.export_diff"
+    bl_label = "Änderungen seit letztem Export (XLSX)"
+    filename_ext = ".xlsx"
+
+    export_all: BoolProperty(
+        name="Export all objects",
+        description="Alle Mesh-Objekte exportieren (statt nur selektierte)",
+        default=True
+    )
+    export_sketch: BoolProperty(
+        name="Sketch-Objekte exportieren",
+        description="Exportiere Objekte, die 'Sketch' im Namen haben",
+        default=False
+    )
+    update_fingerprint: BoolProperty(
+        name="Als neuen Stand merken",
+        description="Nach dem Export den aktuellen Stand als Vergleichsbasis speichern",
+        default=True
+    )
+
+    def execute(self, context):
+        alt = load_fingerprint(context.scene)
+        if alt is None:
+            self.report({'WARNING'}, "Noch kein früherer Export gespeichert – bitte zuerst die Cutlist als XLSX exportieren.")
+            return {'CANCELLED'}
+        plates = list(context.scene.plate_settings.plates)
+        parts_grouped = group_parts(collect_objects(context, self.export_all, self.export_sketch))
+        bedarf, _warnungen = sheet_demand(plates, parts_grouped)
+        neu = make_fingerprint(parts_grouped, bedarf)
+        zeilen = diff_fingerprints(alt, neu)
+
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Änderungen"
+        ws.append(['PLATTENBEDARF DELTA'])
+        ws.append(['Dicke (mm)', 'Plattenname', 'Format (mm)', 'Bisher', 'Neu', 'Differenz'])
+        for plate, anzahl in bedarf:
+            vorher = alt["bedarf"].get(plate_material_name(plate), 0)
+            if anzahl or vorher:
+                ws.append([plate.thickness, plate.name, f"{int(plate.length)} x {int(plate.width)}", vorher, anzahl, anzahl - vorher])
+        ws.append([])
+        ws.append(['ÄNDERUNGEN'])
+        ws.append(['Status', 'Beispielname', 'Länge (mm)', 'Breite (mm)', 'Dicke (mm)', 'Plattenmaterial',
+                   'Stückzahl bisher', 'Stückzahl neu', 'Differenz'])
+        for zeile in zeilen:
+            ws.append(zeile)
+        wb.save(self.filepath)
+        if self.update_fingerprint:
+            store_fingerprint(context.scene, neu)
+        self.report({'INFO'}, f"{len(zeilen)} geänderte Gruppen exportiert.")
+        return {'FINISHED'}
+
+# --- Maschinenexport (NDJSON/CSV) ------------------------------------------
+# Datensätze werden als Generator erzeugt und zeilenweise geschrieben. Jeder
+# Datensatz trägt "schema"; bei inkompatiblen Feldänderungen hochzählen.
+
+EXPORT_SCHEMA = 1
+PART_FIELDS = ["schema", "typ", "name", "laenge", "breite", "dicke", "collection", "material", "stueckzahl", "kommentar", "ausrichtung",
+               "faser_fix", "kanten", "prioritaet", "code"]
+PLACEMENT_FIELDS = ["schema", "typ", "material", "platte", "reststueck", "platte_laenge", "platte_breite",
+                    "name", "x", "y", "w", "h", "laenge", "breite", "gedreht"]
+
+def iter_part_records(parts_grouped):
+    for p in parts_grouped.values():
+        yield {
+            "schema": EXPORT_SCHEMA,
+            "typ": "teil",
+            "name": p["name"],
+            "laenge": p["laenge"],
+            "breite": p["breite"],
+            "dicke": p["dicke"],
+            "collection": p["col_name"],
+            "material": p["mat_name"],
+            "stueckzahl": p["stueckzahl"],
+            "kommentar": p["comment"],
+            "ausrichtung": p["orientation"],
+            "faser_fix": bool(p["grain_lock"]),
+            "kanten": edge_label(p["kanten"]),
+            "prioritaet": p["priority"],
+            "code": part_code(p),
+        }
+
+def iter_placement_records(plates):
+    # Platzierungen aus dem letzten Schnittbild-Lauf, soweit für die Platte vorhanden
+    for plate in plates:
+        state = _nesting_state.get(nesting_state_key(plate))
+        if not state:
+            continue
+        mat_name = plate_material_name(plate)
+        for platenummer, sheet in enumerate(state["layout"], start=1):
+            for pl in sheet["placements"]:
+                yield {
+                    "schema": EXPORT_SCHEMA,
+                    "typ": "platzierung",
+                    "material": mat_name,
+                    "platte": platenummer,
+                    "reststueck": sheet["offcut_id"],
+                    "platte_laenge": float(sheet["length"]),
+                    "platte_breite": float(sheet["width"]),
+                    "name": pl["name"],
+                    "x": round(float(pl["x"]), 2),
+                    "y": round(float(pl["y"]), 2),
+                    "w": round(float(pl["w"]), 2),
+                    "h": round(float(pl["h"]), 2),
+                    "laenge": float(pl["laenge"]),
+                    "breite": float(pl["breite"]),
+                    "gedreht": bool(pl["gedreht"]),
+                }
+
+def write_ndjson(path, *record_streams):
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="\n") as fp:
+        for records in record_streams:
+            for record in records:
+                fp.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+                fp.write("\n")
+                n += 1
+    return n
+
+def write_csv(path, fields, records):
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="") as fp:
+        writer = csv.DictWriter(fp, fieldnames=fields, delimiter=";")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            n += 1
+    return n
+
+class CUTLIST_OT_ExportMachine(Operator, ExportHelper):
+    bl_idname = "cutlist.export_machine"
+    bl_label = "Export Cutlist für Maschine/ERP"
+    filename_ext = ".ndjson"
+
+    file_format: EnumProperty(
+        name="Format",
+        items=[("NDJSON", "NDJSON", "Ein JSON-Datensatz pro Zeile"),
+               ("CSV", "CSV", "Teile und Platzierungen als getrennte CSV-Dateien (Semikolon)")],
+        default="NDJSON"
+    )
+    export_all: BoolProperty(
+        name="Export all objects",
+        description="Alle Mesh-Objekte exportieren (statt nur selektierte)",
+        default=True
+    )
+    export_sketch: BoolProperty(
+        name="Sketch-Objekte exportieren",
+        description="Exportiere Objekte, die 'Sketch' im Namen haben",
+        default=False
+    )
+    include_placements: BoolProperty(
+        name="Platzierungen",
+        description="Teilepositionen aus dem letzten Schnittbild mit ausgeben",
+        default=True
+    )
+
+    def execute(self, context):
+        parts_grouped = group_parts(collect_objects(context, self.export_all, self.export_sketch))
+        plates = list(context.scene.plate_settings.plates)
+        basis = os.path.splitext(self.filepath)[0]
+        if self.file_format == "NDJSON":
+            streams = [iter_part_records(parts_grouped)]
+            if self.include_placements:
+                streams.append(iter_placement_records(plates))
+            pfad = basis + ".ndjson"
+            n = write_ndjson(pfad, *streams)
+        else:
+            pfad = basis + ".csv"
+            n = write_csv(pfad, PART_FIELDS, iter_part_records(parts_grouped))
+            if self.include_placements:
+                n += write_csv(basis + "_platzierungen.csv", PLACEMENT_FIELDS, iter_placement_records(plates))
+        self.report({'INFO'}, f"{n} Datensätze exportiert: {pfad}")
+        return {'FINISHED'}
+
 class CUTLIST_OT_ExportPDF(Operator, ExportHelper):
     bl_idname = "cutlist.export_pdf"
     bl_label = "Export Cutlist als PDF"
     filename_ext = ".pdf"
 
+    include_hierarchy: BoolProperty(
+        name="Collection-Hierarchie",
+        description="Abschnitt mit Teilen, Fläche und Plattenbedarf je Collection-Ebene anhängen",
+        default=True
+    )
+
     def execute(self, context):
         try:
             from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
@@ -330,20 +2926,24 @@ class CUTLIST_OT_ExportPDF(Operator, ExportHelper):
             from reportlab.lib.styles import getSampleStyleSheet
 
             cutlist_rows = []
-            for obj in bpy.context.scene.objects:
-                if obj.type == 'MESH':
-                    dims = sorted([obj.dimensions.x, obj.dimensions.y, obj.dimensions.z], reverse=True)
-                    mat_name = obj.active_material.name if getattr(obj, "active_material", None) else ""
-                    cutlist_rows.append([
-                        obj.name,
-                        int(dims[0]), int(dims[1]), int(dims[2]),
-                        obj.users_collection[0].name if obj.users_collection else "",
-                        mat_name, 1,
-                        getattr(obj, 'comment', ""), getattr(obj, 'orientation', "LONG")
-                    ])
-
-            headers = ['Beispielname', 'Länge (mm)', 'Breite (mm)', 'Dicke (mm)', 'Collection',
-                       'Plattenmaterial', 'Stückzahl', 'Kommentar', 'Ausrichtung']
+            objects = collect_objects(context, export_sketch=True)
+            # Code der Gruppe wie auf den Etiketten, damit ein gescanntes Etikett die Zeilen findet
+            messungen = {}
+            parts_grouped = group_parts(objects, messungen)
+            for obj, props in zip(objects, read_part_props(objects)):
+                comment, orientation, grain_lock, kanten, priority = props
+                dims = sorted([obj.dimensions.x, obj.dimensions.y, obj.dimensions.z], reverse=True)
+                mat_name = obj.active_material.name if getattr(obj, "active_material", None) else ""
+                cutlist_rows.append([
+                    obj.name,
+                    int(dims[0]), int(dims[1]), int(dims[2]),
+                    obj.users_collection[0].name if obj.users_collection else "",
+                    mat_name, 1,
+                    comment, orientation, "ja" if grain_lock else "", edge_label(kanten), priority,
+                    part_code(parts_grouped[part_group_key(messungen[obj], props)])
+                ])
+
+            headers = CUTLIST_HEADERS
 
             doc = SimpleDocTemplate(self.filepath, pagesize=landscape(A4))
             elements = []
@@ -358,119 +2958,751 @@ class CUTLIST_OT_ExportPDF(Operator, ExportHelper):
                 ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
             ]))
             elements.append(table)
+            if self.include_hierarchy:
+                zeilen = collection_report(context.scene, objects, list(context.scene.plate_settings.plates))
+                elements.append(Paragraph("Collection-Hierarchie", styles["Heading2"]))
+                table = Table([HIERARCHY_HEADERS] + [hierarchy_row(z) for z in zeilen], repeatRows=1)
+                table.setStyle(TableStyle([
+                    ('GRID', (0,0), (-1,-1), 0.5, colors.black),
+                    ('BACKGROUND', (0,0), (-1,0), colors.lightgrey),
+                    ('ALIGN', (1,0), (-2,-1), 'CENTER'),
+                    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+                ]))
+                elements.append(table)
             doc.build(elements)
             self.report({'INFO'}, "PDF mit Tabelle (nur orientation).")
         except Exception as e:
             self.report({'WARNING'}, f"PDF-Export benötigt reportlab: {e}")
         return {'FINISHED'}
 
+# Etiketten: 3 x 8 pro A4-Seite (70 x 37 mm). Jede Gruppe wird einmal als
+# PDF-Form (XObject) mit Text, Barcode und QR-Code gezeichnet und danach nur
+# noch referenziert; Seiten werden fortlaufend mit showPage() abgeschlossen.
+LABEL_COLS, LABEL_ROWS = 3, 8
+
+def label_payload(part):
+    return f"{part['name']}|{part['laenge']}x{part['breite']}x{part['dicke']}|{part['mat_name']}"
+
+def label_details(part):
+    # Teileigenschaften für die Etikettzeile, leer bei Standardwerten
+    angaben = []
+    if part["grain_lock"]:
+        angaben.append("Faser fix")
+    if any(part["kanten"]):
+        angaben.append(f"Kanten {edge_label(part['kanten'])}")
+    if part["priority"]:
+        angaben.append(f"Prio {part['priority']}")
+    return ", ".join(angaben)
+
+def label_code(payload):
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=6).hexdigest().upper()
+
+def part_code(part):
+    # Barcode-Inhalt der Etiketten; steht auch in Cutlist und Maschinen-Export
+    return label_code(label_payload(part))
+
+def write_label_pdf(filepath, parts_grouped, with_qr=True):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import mm
+    from reportlab.graphics.barcode import code128, qrencoder
+
+    page_w, page_h = A4
+    label_w, label_h = 70 * mm, 37 * mm
+    rand_x = (page_w - LABEL_COLS * label_w) / 2
+    rand_y = (page_h - LABEL_ROWS * label_h) / 2
+    c = canvas.Canvas(filepath, pagesize=A4, pageCompression=1)
+    formen = {}
+
+    def form_fuer(part):
+        payload = label_payload(part)
+        details = label_details(part)
+        name = formen.get((payload, details))
+        if name is not None:
+            return name
+        name = f"lbl{len(formen)}"
+        c.beginForm(name, lowerx=0, lowery=0, upperx=label_w, uppery=label_h)
+        c.setFont("Helvetica-Bold", 9)
+        c.drawString(3 * mm, label_h - 6 * mm, str(part["name"])[:32])
+        c.setFont("Helvetica", 8)
+        c.drawString(3 * mm, label_h - 10.5 * mm, f"{part['laenge']} x {part['breite']} x {part['dicke']} mm")
+        c.drawString(3 * mm, label_h - 14.5 * mm, str(part["mat_name"])[:36])
+        if details:
+            c.drawString(3 * mm, label_h - 18.5 * mm, details[:36])
+        barcode = code128.Code128(label_code(payload), barHeight=10 * mm, barWidth=0.9)
+        barcode.drawOn(c, 0, 3 * mm)
+        if with_qr:
+            # direkt über den Encoder mit fester Maske 0 statt QrCodeWidget: spart die
+            # Suche über alle acht Masken und die Shape-Objekte pro Modul
+            qr = qrencoder.QRCode(None, qrencoder.QRErrorCorrectLevel.M)
+            qr.addData(payload)
+            qr.version = qr.calculate_version()
+            qr.makeImpl(False, 0)
+            module = qr.getModuleCount()
+            groesse = 20 * mm
+            modul = groesse / module
+            x0, y0 = label_w - groesse - 2 * mm, label_h - 2 * mm
+            pfad = c.beginPath()
+            for r in range(module):
+                for col in range(module):
+                    if qr.isDark(r, col):
+                        pfad.rect(x0 + col * modul, y0 - (r + 1) * modul, modul, modul)
+            c.drawPath(pfad, stroke=0, fill=1)
+        c.endForm()
+        formen[(payload, details)] = name
+        return name
+
+    pro_seite = LABEL_COLS * LABEL_ROWS
+    anzahl = 0
+    for part in parts_grouped.values():
+        name = form_fuer(part)
+        for stueck in range(1, part["stueckzahl"] + 1):
+            platz = anzahl % pro_seite
+            if anzahl and platz == 0:
+                c.showPage()
+            x = rand_x + (platz % LABEL_COLS) * label_w
+            y = page_h - rand_y - (platz // LABEL_COLS + 1) * label_h
+            c.saveState()
+            c.translate(x, y)
+            c.doForm(name)
+            c.setFont("Helvetica", 7)
+            c.drawRightString(label_w - 2 * mm, 2 * mm, f"{stueck}/{part['stueckzahl']}")
+            c.restoreState()
+            anzahl += 1
+    c.save()
+    return anzahl, len(formen)
+
+class CUTLIST_OT_ExportLabels(Operator, ExportHelper):
+    bl_idname = "cutlist.export_labels"
+    bl_label = "Teile-Etiketten exportieren (PDF)"
+    filename_ext = ".pdf"
+
+    export_all: BoolProperty(
+        name="Export all objects",
+        description="Alle Mesh-Objekte exportieren (statt nur selektierte)",
+        default=True
+    )
+    export_sketch: BoolProperty(
+        name="Sketch-Objekte exportieren",
+        description="Exportiere Objekte, die 'Sketch' im Namen haben",
+        default=False
+    )
+    with_qr: BoolProperty(name="QR-Code", description="Zusätzlich zum Barcode einen QR-Code mit allen Teiledaten drucken", default=True)
+
+    def execute(self, context):
+        try:
+            parts_grouped = group_parts(collect_objects(context, self.export_all, self.export_sketch))
+            anzahl, formen = write_label_pdf(self.filepath, parts_grouped, self.with_qr)
+            self.report({'INFO'}, f"{anzahl} Etiketten exportiert ({formen} verschiedene).")
+        except ImportError as e:
+            self.report({'WARNING'}, f"Etiketten-Export benötigt reportlab: {e}")
+        return {'FINISHED'}
+
+# --- Schrift und Beschriftung ---------------------------------------------
+# Die Schriftdatei wird einmal aufgelöst (Einstellung, fontconfig, bekannte
+# Namen), geladene Schriften und gemessene Beschriftungen werden gemerkt.
+
+LABEL_MIN_SIZE = 7
+FONT_CANDIDATES = ("arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf")
+_font_path_cache = {}
+
+def resolve_font_path(configured=""):
+    if configured in _font_path_cache:
+        return _font_path_cache[configured]
+    from PIL import ImageFont
+    kandidaten = []
+    if configured:
+        kandidaten.append(bpy.path.abspath(configured))
+    if shutil.which("fc-match"):
+        try:
+            gefunden = subprocess.run(["fc-match", "-f", "%{file}", "sans-serif"], capture_output=True, text=True, timeout=2).stdout.strip()
+            if gefunden:
+                kandidaten.append(gefunden)
+        except (OSError, subprocess.SubprocessError):
+            pass
+    kandidaten.extend(FONT_CANDIDATES)
+    pfad = None
+    for kandidat in kandidaten:
+        try:
+            ImageFont.truetype(kandidat, 12)
+        except OSError:
+            continue
+        pfad = kandidat
+        break
+    _font_path_cache[configured] = pfad
+    return pfad
+
+@functools.lru_cache(maxsize=64)
+def load_font(path, size):
+    from PIL import ImageFont
+    if path:
+        return ImageFont.truetype(path, size)
+    try:
+        return ImageFont.load_default(size)
+    except TypeError:
+        # Pillow < 10.1: nur die feste Bitmap-Schrift
+        return ImageFont.load_default()
+
+@functools.lru_cache(maxsize=65536)
+def measure_label(text, path, size):
+    from PIL import Image, ImageDraw
+    left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).multiline_textbbox((0, 0), text, font=load_font(path, size))
+    return right, bottom
+
+@functools.lru_cache(maxsize=65536)
+def fit_label(text, path, size, max_w, max_h):
+    # -> (text, size) der größten passenden Beschriftung oder None
+    for kandidat in (text, text.split("\n", 1)[0]):
+        w, h = measure_label(kandidat, path, size)
+        if w <= max_w and h <= max_h:
+            return kandidat, size
+        # Textbreite wächst etwa linear mit der Schriftgröße: direkt dort weitermessen
+        groesse = min(size - 1, int(size * min(max_w / max(w, 1), max_h / max(h, 1))))
+        while groesse >= LABEL_MIN_SIZE:
+            w, h = measure_label(kandidat, path, groesse)
+            if w <= max_w and h <= max_h:
+                return kandidat, groesse
+            groesse -= 1
+    return None
+
+# Gerenderte Platten werden pro Inhalt gemerkt, damit nach einer kleinen
+# Änderung nur die betroffenen Platten neu gezeichnet werden.
+_sheet_render_cache = {}
+
+def _render_sheet(sheet, scale, pw, ph, font_path, font_size):
+    from PIL import Image, ImageDraw
+    img = Image.new("RGBA", (pw + 1, ph + 1), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([0, 0, int(sheet["length"] / scale), int(sheet["width"] / scale)], outline="black", width=2)
+    for p in sheet["placements"]:
+        x, y = int(p["x"] / scale), int(p["y"] / scale)
+        w, h = int(p["w"] / scale), int(p["h"] / scale)
+        fillcol = (190, 230, 245, 255) if p["gedreht"] else (220, 245, 255, 255)
+        text = f"{p['name']}\n{p['laenge']}x{p['breite']}" + (" (quer)" if p["gedreht"] else "")
+        if "polygon" in p:
+            draw.polygon([(int(px / scale), int(py / scale)) for px, py in p["polygon"]], outline="black", width=2, fill=fillcol)
+        else:
+            draw.rectangle([x, y, x + w, y + h], outline="black", width=2, fill=fillcol)
+        label = fit_label(text, font_path, font_size, w - 6, h - 4)
+        if label:
+            draw.multiline_text((x+4, y+2), label[0], fill="blue", font=load_font(font_path, label[1]))
+    for cut in sheet.get("cuts") or []:
+        lx0, ly0, lx1, ly1 = (int(v / scale) for v in cut["linie"])
+        draw.line([lx0, ly0, lx1, ly1], fill="red", width=1)
+        draw.text((lx0 + 2, ly0 + 2) if cut["art"] == "Querschnitt" else (lx0 + 2, ly0 - 12), str(cut["nr"]), fill="red")
+    return img
+
+def _sheet_signature(sheet):
+    return (sheet["length"], sheet["width"], tuple(
+        (p["x"], p["y"], p["w"], p["h"], p["name"], p["laenge"], p["breite"], p["gedreht"], tuple(p.get("polygon", ())))
+        for p in sheet["placements"]
+    ))
+
+def render_sheet_images(layout, plate, font_size, font_path=""):
+    # ein Bild pro Platte: 32 px Kopfzeile + Platte
+    from PIL import Image, ImageDraw
+    TARGET_W, TARGET_H = 900, 600
+    scale = min(max(plate.length / TARGET_W, plate.width / TARGET_H), plate.length / 300, plate.width / 200)
+    pw = max(int(plate.length / scale), 300)
+    ph = max(int(plate.width / scale), 200)
+    font_path = resolve_font_path(font_path)
+    font = load_font(font_path, font_size)
+    bilder = []
+    verwendet = {}
+    for platenummer, sheet in enumerate(layout, start=1):
+        img = Image.new("RGBA", (pw + 1, ph + 32), (255, 255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        if sheet["offcut_id"] is None:
+            sheet_label = f"Platte {platenummer} ({int(sheet['length'])}x{int(sheet['width'])})"
+        else:
+            sheet_label = f"Platte {platenummer}: Reststück #{sheet['offcut_id']} ({int(sheet['length'])}x{int(sheet['width'])})"
+        draw.text((8, 8), sheet_label, fill="black", font=font)
+        key = (_sheet_signature(sheet), len(sheet.get("cuts") or []), scale, font_path, font_size)
+        sheet_img = _sheet_render_cache.get(key) or _render_sheet(sheet, scale, pw, ph, font_path, font_size)
+        verwendet[key] = sheet_img
+        img.paste(sheet_img, (0, 32))
+        bilder.append(img)
+    _sheet_render_cache.clear()
+    _sheet_render_cache.update(verwendet)
+    return bilder
+
+def render_nesting(layout, plate, font_size, font_path=""):
+    from PIL import Image
+    bilder = render_sheet_images(layout, plate, font_size, font_path)
+    if not bilder:
+        return Image.new("RGBA", (301, 232), (255, 255, 255, 255))
+    w, h = bilder[0].size
+    img = Image.new("RGBA", (w, h * len(bilder)), (255, 255, 255, 255))
+    for i, bild in enumerate(bilder):
+        img.paste(bild, (0, h * i))
+    return img
+
+IMAGE_EXTENSIONS = {"PNG": ".png", "WEBP": ".webp", "JPEG": ".jpg"}
+
+def encode_image(img, fmt, compress_level=6, quality=85):
+    buf = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buf, "PNG", compress_level=compress_level)
+    elif fmt == "WEBP":
+        img.save(buf, "WEBP", quality=quality, method=4)
+    else:
+        img.convert("RGB").save(buf, "JPEG", quality=quality, optimize=True)
+    return buf.getvalue()
+
+def save_sheet_images(bilder, filepath, fmt, compress_level=6, quality=85, bundle=False):
+    # kodiert die Einzelbilder parallel (Pillow gibt beim Kodieren den GIL frei)
+    basis, ext = os.path.splitext(filepath)[0], IMAGE_EXTENSIONS[fmt]
+    namen = [f"{os.path.basename(basis)}_{i:03d}{ext}" for i in range(1, len(bilder) + 1)]
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        daten = list(pool.map(lambda bild: encode_image(bild, fmt, compress_level, quality), bilder))
+    if bundle:
+        pfad = basis + ".zip"
+        with zipfile.ZipFile(pfad, "w", compression=zipfile.ZIP_STORED) as zf:
+            for name, inhalt in zip(namen, daten):
+                zf.writestr(name, inhalt)
+        return [pfad]
+    pfade = []
+    for name, inhalt in zip(namen, daten):
+        pfad = os.path.join(os.path.dirname(basis), name)
+        with open(pfad, "wb") as fp:
+            fp.write(inhalt)
+        pfade.append(pfad)
+    return pfade
+
 class CUTLIST_OT_NestingImage(Operator, ExportHelper):
     bl_idname = "cutlist.nesting_image"
     bl_label = "Schnittbild exportieren (PNG)"
     filename_ext = ".png"
 
+    use_offcuts: BoolProperty(
+        name="Reststücke verwenden",
+        description="Passende Reststücke aus dem Lager vor neuen Platten belegen",
+        default=True
+    )
+    book_offcuts: BoolProperty(
+        name="Reststücke verbuchen",
+        description="Verwendete Reststücke aus dem Lager entfernen und neue verwertbare Reste einlagern",
+        default=False
+    )
+    optimize: BoolProperty(
+        name="Anordnung optimieren",
+        description="Reihenfolge (und bei Ausrichtung 'Beliebig' Drehung) der Teile per Simulated Annealing verbessern",
+        default=False
+    )
+    time_budget: FloatProperty(name="Zeitbudget (s)", default=5.0, min=0.1, max=600.0)
+    max_iterations: IntProperty(name="Max. Iterationen", default=2000, min=1)
+    show_cuts: BoolProperty(
+        name="Schnittfolge einzeichnen",
+        description="Nummerierte Guillotine-Schnitte (Längs- vor Querschnitten) ins Schnittbild zeichnen",
+        default=True
+    )
+    polygon_mode: BoolProperty(
+        name="Umrisse verschachteln",
+        description="Nicht-rechteckige Teile nach ihrem Umriss (konvexe Hülle) statt nach dem Hüllquader platzieren",
+        default=False
+    )
+    polygon_time_budget: FloatProperty(name="Zeitbudget Umrisse (s)", default=10.0, min=0.1, max=600.0)
+    image_format: EnumProperty(
+        name="Format",
+        items=[("PNG", "PNG", "Verlustfrei"), ("WEBP", "WebP", "Klein, für Vorschauen"), ("JPEG", "JPEG", "Klein, ohne Transparenz")],
+        default="PNG"
+    )
+    png_compression: IntProperty(name="PNG-Kompression", description="0 = schnell/groß, 9 = langsam/klein", default=6, min=0, max=9)
+    image_quality: IntProperty(name="Qualität", description="Für WebP/JPEG", default=85, min=1, max=100)
+    split_sheets: BoolProperty(
+        name="Ein Bild pro Platte",
+        description="Jede Platte als eigene Datei, parallel kodiert",
+        default=False
+    )
+    zip_bundle: BoolProperty(
+        name="Als ZIP bündeln",
+        description="Einzelbilder in einer ZIP-Datei zusammenfassen",
+        default=False
+    )
+    incremental: BoolProperty(
+        name="Nur Änderungen neu berechnen",
+        description="Vorheriges Layout behalten und nur Platten mit geänderten Teilen neu packen (nicht mit Reststücken)",
+        default=True
+    )
+
     def execute(self, context):
         try:
-            from PIL import Image, ImageDraw, ImageFont
             settings = context.scene.plate_settings
-            font_size = settings.font_size
             if len(settings.plates) == 0:
                 self.report({'WARNING'}, "Keine Platte definiert!")
                 return {'CANCELLED'}
             plate = settings.plates[settings.plate_index]
-            parts = []
-            for obj in bpy.context.scene.objects:
-                if obj.type == 'MESH':
-                    dims = sorted([obj.dimensions.x, obj.dimensions.y], reverse=True)
-                    parts.append((int(dims[0]), int(dims[1]), 1, obj.name))
-            TARGET_W, TARGET_H = 900, 600
-            scale = min(max(plate.length / TARGET_W, plate.width / TARGET_H), plate.length / 300, plate.width / 200)
-            pw = int(plate.length / scale)
-            ph = int(plate.width / scale)
-            pw = max(pw, 300)
-            ph = max(ph, 200)
-            max_parts = len(parts)
-            total_height = ph * max_parts + 32 * max_parts
-            img = Image.new("RGBA", (pw, total_height), (255, 255, 255, 255))
-            draw = ImageDraw.Draw(img)
+            gesperrt = set()
+            parts, zu_gross = split_oversize(plate, nesting_parts_for_plate(context, plate, gesperrt), gesperrt)
+            if zu_gross:
+                namen = ", ".join(p[2] for p in zu_gross[:5]) + (" …" if len(zu_gross) > 5 else "")
+                self.report({'WARNING'}, f"{len(zu_gross)} Teile größer als die Platte, nicht verschachtelt: {namen}")
+            rotations = None
+            if self.polygon_mode:
+                return self.execute_polygons(context, plate, parts, gesperrt)
+            if self.optimize and parts:
+                annealer = NestingAnnealer(plate.length, plate.width, parts, plate.orientation,
+                                           locked=grain_lock_mask(parts, gesperrt))
+                annealer.run(self.time_budget, self.max_iterations)
+                parts, rotations = annealer.best_parts(parts)
+                self.report({'INFO'}, f"Optimierung: Bewertung {annealer.start_score:.3f} -> {annealer.best_score:.3f} "
+                                      f"({math.ceil(annealer.start_score)} -> {math.ceil(annealer.best_score)} Platten, "
+                                      f"{annealer.iteration} Iterationen in {annealer.elapsed:.1f} s)")
+            inventory = OffcutInventory() if self.use_offcuts else None
             try:
-                font = ImageFont.truetype("arial.ttf", font_size)
-            except Exception:
-                font = None
-            platenummer = 1
-            part_idx = 0
-            while part_idx < len(parts):
-                top = ph * (platenummer-1) + 32 * (platenummer-1)
-                draw.rectangle([0, top, pw, top+ph], outline="black", width=2)
-                sheet_label = f"Platte {platenummer} ({int(plate.length)}x{int(plate.width)})"
-                if font:
-                    draw.text((8, top+8), sheet_label, fill="black", font=font)
+                if rotations is None:
+                    layout, betroffen = nest_parts_cached(plate, parts, inventory, self.incremental)
+                    if self.incremental and len(betroffen) < len(layout):
+                        self.report({'INFO'}, f"{len(betroffen)} von {len(layout)} Platten neu berechnet.")
                 else:
-                    draw.text((8, top+8), sheet_label, fill="black")
-                x, y, rowh = 0, top + 32, 0
-                while part_idx < len(parts):
-                    l, b, qty, name = parts[part_idx]
-                    # Nur die orientation pro Platte
-                    if plate.orientation == "CROSS":
-                        w, h = int(b / scale), int(l / scale)
-                    else:  # LONG
-                        w, h = int(l / scale), int(b / scale)
-                    was_rotated = plate.orientation == "CROSS"
-                    if x + w > pw:
-                        x = 0
-                        y += rowh + 6
-                        rowh = 0
-                    if (y + h) > (top + ph):
-                        break
-                    fillcol = (190, 230, 245, 255) if was_rotated else (220, 245, 255, 255)
-                    text = f"{name}\n{l}x{b}" + (" (quer)" if was_rotated else "")
-                    draw.rectangle([x, y, x + w, y + h], outline="black", width=2, fill=fillcol)
-                    if font:
-                        draw.text((x+4, y+2), text, fill="blue", font=font)
-                    else:
-                        draw.text((x+4, y+2), text, fill="blue")
-                    x += w + 6
-                    rowh = max(rowh, h)
-                    part_idx += 1
-                platenummer += 1
-            final_height = ph * (platenummer-1) + 32 * (platenummer-1)
-            img = img.crop((0, 0, pw, final_height))
-            img.save(self.filepath)
-            self.report({'INFO'}, f"{platenummer-1} Platten/Schnittbilder untereinander exportiert (Orientation).")
-        except Exception as e:
+                    layout = nest_parts(plate, parts, inventory, rotations)
+                    remember_nesting(plate, parts, layout)
+                fehler = validate_layout(layout, plate.orientation)
+                if fehler:
+                    self.report({'WARNING'}, f"Layout ungültig ({len(fehler)} Fehler): " + "; ".join(fehler[:3]))
+                for sheet in layout:
+                    if not self.show_cuts:
+                        sheet["cuts"] = []
+                    elif not sheet.get("cuts"):
+                        sheet["cuts"] = cut_sequence(sheet)[0]
+                self.save_images(layout, plate, settings)
+                reste = sum(1 for sheet in layout if sheet["offcut_id"] is not None)
+                if inventory is not None and self.book_offcuts:
+                    neue = inventory.book(plate, layout, settings.offcut_min, source=os.path.basename(self.filepath) or "Vorschau")
+                    self.report({'INFO'}, f"{len(layout)} Platten/Schnittbilder exportiert, davon {reste} Reststücke; {neue} neue Reste eingelagert.")
+                else:
+                    self.report({'INFO'}, f"{len(layout)} Platten/Schnittbilder untereinander exportiert (Orientation), davon {reste} Reststücke.")
+            finally:
+                if inventory is not None:
+                    inventory.close()
+        except ImportError as e:
             self.report({'WARNING'}, f"PIL nötig für PNG-Export: {e}")
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        return {'FINISHED'}
+
+    def save_images(self, layout, plate, settings):
+        if self.split_sheets or self.zip_bundle:
+            bilder = render_sheet_images(layout, plate, settings.font_size, settings.font_path)
+            return save_sheet_images(bilder, self.filepath, self.image_format, self.png_compression,
+                                     self.image_quality, self.zip_bundle)
+        pfad = os.path.splitext(self.filepath)[0] + IMAGE_EXTENSIONS[self.image_format]
+        with open(pfad, "wb") as fp:
+            fp.write(encode_image(render_nesting(layout, plate, settings.font_size, settings.font_path), self.image_format,
+                                  self.png_compression, self.image_quality))
+        return [pfad]
+
+    def execute_polygons(self, context, plate, parts, gesperrt=frozenset()):
+        settings = context.scene.plate_settings
+        outlines = {}
+        for _l, _b, name in parts:
+            obj = context.scene.objects.get(name)
+            if obj is not None and obj.type == 'MESH' and len(obj.data.vertices) >= 3:
+                outlines[name] = part_outline(obj)
+        layout, als_rechteck = nest_polygons(plate, parts, outlines, self.polygon_time_budget, gesperrt=gesperrt)
+        try:
+            save_nfp_cache()
+        except OSError:
+            pass
+        fehler = validate_layout(layout, plate.orientation)
+        if fehler:
+            self.report({'WARNING'}, f"Layout ungültig ({len(fehler)} Fehler): " + "; ".join(fehler[:3]))
+        for sheet in layout:
+            sheet["cuts"] = []
+        self.save_images(layout, plate, settings)
+        self.report({'INFO'}, f"{len(layout)} Platten nach Umriss verschachtelt, {als_rechteck} Teile als Rechteck gelegt.")
+        return {'FINISHED'}
+
+# --- Vorschau in Blender ------------------------------------------------------
+# Das Schnittbild wird ohne Umweg über eine Datei in ein Bild-Datenblock
+# geschrieben: PIL -> NumPy (Zeilen gespiegelt, Blender zählt von unten) ->
+# ein einziges pixels.foreach_set. Gleicher Name = derselbe Datenblock.
+
+PREVIEW_IMAGE_NAME = "Cutlist Schnittbild"
+
+def update_preview_image(img, name=PREVIEW_IMAGE_NAME):
+    rgba = np.asarray(img.convert("RGBA"), dtype=np.uint8)
+    h, w = rgba.shape[:2]
+    pixels = np.empty((h, w, 4), dtype=np.float32)
+    np.multiply(rgba[::-1], 1.0 / 255.0, out=pixels)
+    image = bpy.data.images.get(name)
+    if image is None:
+        image = bpy.data.images.new(name, w, h, alpha=True)
+    elif tuple(image.size) != (w, h):
+        image.scale(w, h)
+    image.pixels.foreach_set(pixels.ravel())
+    image.update()
+    return image
+
+def show_preview_image(context, image):
+    # im Hintergrundmodus gibt es keine Fenster, dann bleibt es beim Datenblock
+    for window in context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == 'IMAGE_EDITOR':
+                area.spaces.active.image = image
+                area.tag_redraw()
+
+class CUTLIST_OT_NestingPreview(CUTLIST_OT_NestingImage):
+    bl_idname = "cutlist.nesting_preview"
+    bl_label = "Schnittbild in Blender anzeigen"
+    bl_description = f"Schnittbild berechnen und in das Bild '{PREVIEW_IMAGE_NAME}' schreiben, ohne Datei"
+
+    max_sheets: IntProperty(name="Max. Platten in der Vorschau", default=20, min=1)
+
+    def invoke(self, context, event):
+        return self.execute(context)
+
+    def save_images(self, layout, plate, settings):
+        img = render_nesting(layout[:self.max_sheets], plate, settings.font_size, settings.font_path)
+        image = update_preview_image(img)
+        show_preview_image(context=bpy.context, image=image)
+        if len(layout) > self.max_sheets:
+            self.report({'INFO'}, f"Vorschau zeigt {self.max_sheets} von {len(layout)} Platten.")
+        return []
+
+class CUTLIST_OT_NestingJobStart(Operator):
+    bl_idname = "cutlist.nesting_job_start"
+    bl_label = "Optimierung als Job starten"
+    bl_description = ("Optimiert das Schnittbild der aktiven Platte im Hintergrund mit regelmäßigen Checkpoints; "
+                      "ein vorhandener Job mit denselben Teilen wird fortgesetzt")
+
+    time_budget: FloatProperty(name="Zeitbudget (s)", default=600.0, min=1.0)
+    max_iterations: IntProperty(name="Max. Iterationen", default=1000000, min=1)
+    restart: BoolProperty(name="Neu beginnen", description="Vorhandenen Checkpoint verwerfen", default=False)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        settings = context.scene.plate_settings
+        if len(settings.plates) == 0:
+            self.report({'WARNING'}, "Keine Platte definiert!")
+            return {'CANCELLED'}
+        plate = PlateSnapshot.from_plate(settings.plates[settings.plate_index])
+        gesperrt = set()
+        parts, zu_gross = split_oversize(plate, nesting_parts_for_plate(context, plate, gesperrt), gesperrt)
+        if zu_gross:
+            self.report({'WARNING'}, f"{len(zu_gross)} Teile größer als die Platte, nicht verschachtelt.")
+        if len(parts) < 2:
+            self.report({'WARNING'}, "Zu wenige Teile für eine Optimierung.")
+            return {'CANCELLED'}
+        locked = grain_lock_mask(parts, gesperrt)
+        job_id = nesting_job_id(plate, parts, locked)
+        job = None
+        if not self.restart and os.path.isfile(os.path.join(nesting_jobs_dir(), job_id, "job.json")):
+            job = NestingJob.load(job_id)
+            job.time_budget = max(job.time_budget, self.time_budget)
+            job.max_iterations = max(job.max_iterations, self.max_iterations)
+        if job is None:
+            job = NestingJob(plate, parts, self.time_budget, self.max_iterations, locked=locked)
+        layout = start_nesting_job(job, blocking=bpy.app.background)
+        self.report({'INFO'}, f"Job {job.job_id}: {len(layout)} Platten sofort verfügbar "
+                              f"({job.annealer.iteration} Iterationen bisher), Suche läuft weiter.")
+        return {'FINISHED'}
+
+_job_items = []
+
+def nesting_job_items(self, context):
+    # Referenzen müssen gehalten werden, solange Blender die Liste anzeigt
+    _job_items[:] = [
+        (meta["job_id"], f"{meta['plate']['name']} – {len(meta['parts'])} Teile, {meta['best_sheets']} Platten ({meta['status']})",
+         f"{meta['iteration']} Iterationen, {meta['elapsed']:.0f} s von {meta['time_budget']:.0f} s")
+        for meta in list_nesting_jobs()
+    ] or [("", "Keine Jobs", "")]
+    return _job_items
+
+class CUTLIST_OT_NestingJobResume(Operator):
+    bl_idname = "cutlist.nesting_job_resume"
+    bl_label = "Nesting-Job fortsetzen"
+    bl_description = "Einen gespeicherten Nesting-Job laden, das beste Layout sofort bereitstellen und weiter optimieren"
+    bl_property = "job"
+
+    job: EnumProperty(name="Job", items=nesting_job_items)
+    blocking: BoolProperty(
+        name="Blockierend",
+        description="Bis zum Ende rechnen statt im Hintergrund (im Hintergrundmodus immer)",
+        default=False
+    )
+
+    def invoke(self, context, event):
+        context.window_manager.invoke_search_popup(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        if not self.job:
+            self.report({'WARNING'}, "Kein gespeicherter Job vorhanden.")
+            return {'CANCELLED'}
+        if self.job in _nesting_jobs:
+            self.report({'INFO'}, f"Job {self.job} läuft bereits.")
+            return {'CANCELLED'}
+        try:
+            job = NestingJob.load(self.job)
+        except (OSError, ValueError, KeyError) as e:
+            self.report({'ERROR'}, f"Job {self.job} konnte nicht geladen werden: {e}")
+            return {'CANCELLED'}
+        layout = start_nesting_job(job, blocking=self.blocking or bpy.app.background)
+        self.report({'INFO'}, f"Job {job.job_id} fortgesetzt: {len(layout)} Platten, {job.progress():.0%} erledigt.")
+        return {'FINISHED'}
+
+class CUTLIST_OT_NestingJobStop(Operator):
+    bl_idname = "cutlist.nesting_job_stop"
+    bl_label = "Nesting-Jobs anhalten"
+    bl_description = "Laufende Jobs speichern und anhalten; sie können später fortgesetzt werden"
+
+    def execute(self, context):
+        anzahl = stop_nesting_jobs()
+        self.report({'INFO'}, f"{anzahl} Jobs angehalten und gespeichert.")
+        return {'FINISHED'}
+
+class CUTLIST_OT_OffcutAdd(Operator):
+    bl_idname = "cutlist.offcut_add"
+    bl_label = "Reststück einlagern"
+
+    length: FloatProperty(name="Länge (mm)", default=1000.0, min=1.0)
+    width: FloatProperty(name="Breite (mm)", default=500.0, min=1.0)
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        settings = context.scene.plate_settings
+        if settings.plate_index >= len(settings.plates):
+            return {'CANCELLED'}
+        plate = settings.plates[settings.plate_index]
+        inventory = OffcutInventory()
+        try:
+            inventory.add(plate.name, plate.thickness, self.length, self.width, source="manuell")
+            inventory.conn.commit()
+            anzahl = inventory.count(plate.name, plate.thickness)
+        finally:
+            inventory.close()
+        self.report({'INFO'}, f"Reststück eingelagert ({anzahl} für {plate.name} {int(plate.thickness)}mm).")
+        return {'FINISHED'}
+
+class CUTLIST_OT_OffcutClear(Operator):
+    bl_idname = "cutlist.offcut_clear"
+    bl_label = "Reststücke der Platte löschen"
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_confirm(self, event)
+
+    def execute(self, context):
+        settings = context.scene.plate_settings
+        if settings.plate_index >= len(settings.plates):
+            return {'CANCELLED'}
+        plate = settings.plates[settings.plate_index]
+        inventory = OffcutInventory()
+        try:
+            inventory.clear(plate.name, plate.thickness)
+            inventory.conn.commit()
+        finally:
+            inventory.close()
+        self.report({'INFO'}, f"Reststücke für {plate.name} {int(plate.thickness)}mm gelöscht.")
+        return {'FINISHED'}
+
+class _DrawRecorder:
+    # nimmt alle layout-Aufrufe an, damit draw() ohne Bildschirm gemessen werden kann
+    def __getattr__(self, name):
+        return self
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+class CUTLIST_OT_BenchmarkDraw(Operator):
+    bl_idname = "cutlist.benchmark_draw"
+    bl_label = "Panel-Zeichenzeit messen"
+    bl_description = "Ruft draw() des Cutlist-Panels wiederholt auf und meldet die Zeit pro Aufruf"
+
+    runs: IntProperty(name="Durchläufe", default=1000, min=1)
+
+    def execute(self, context):
+        panel = type("_BenchmarkPanel", (), {"layout": _DrawRecorder()})()
+        draw = CUTLIST_PT_PlatePanel.draw
+        start = time.perf_counter()
+        for _ in range(self.runs):
+            draw(panel, context)
+        dauer = (time.perf_counter() - start) / self.runs
+        self.report({'INFO'}, f"Panel draw: {dauer * 1e6:.1f} µs pro Aufruf ({self.runs} Durchläufe)")
         return {'FINISHED'}
 
 classes = (
+    CutlistVariantItem,
+    CutlistPartProps,
+    CutlistRule,
     PlateItem,
     PlateSettings,
     CUTLIST_UL_PlateList,
+    CUTLIST_UL_RuleList,
     CUTLIST_PT_PlatePanel,
     CUTLIST_OT_PlateAdd,
     CUTLIST_OT_PlateRemove,
+    CUTLIST_OT_RuleAdd,
+    CUTLIST_OT_RuleRemove,
     CUTLIST_OT_MaterialAssign,
+    CUTLIST_OT_MaterialsAutoAssign,
+    CUTLIST_OT_SetPartProps,
+    CUTLIST_OT_CopyPartProps,
     ExportCutlistXLSXOperator,
     CUTLIST_OT_SavePreset,
     CUTLIST_OT_LoadPreset,
+    CUTLIST_OT_ExportDiff,
+    CUTLIST_OT_ExportVariants,
+    CUTLIST_OT_ExportMachine,
     CUTLIST_OT_ExportPDF,
+    CUTLIST_OT_ExportLabels,
     CUTLIST_OT_NestingImage,
+    CUTLIST_OT_NestingPreview,
+    CUTLIST_OT_NestingJobStart,
+    CUTLIST_OT_NestingJobResume,
+    CUTLIST_OT_NestingJobStop,
+    CUTLIST_OT_OffcutAdd,
+    CUTLIST_OT_OffcutClear,
+    CUTLIST_OT_BenchmarkDraw,
 )
 
 def register():
     for cls in classes:
         bpy.utils.register_class(cls)
     bpy.types.Scene.plate_settings = PointerProperty(type=PlateSettings)
+    bpy.types.Object.cutlist = PointerProperty(type=CutlistPartProps)
     bpy.types.Scene.cutlist_lang = EnumProperty(
         name="Sprache",
         description="Sprachauswahl/Language",
         items=[("de", "DE", ""), ("en", "EN", "")],
         default="de"
     )
+    try:
+        bpy.app.translations.register(__name__, blender_translations())
+    except ValueError:
+        # bereits registriert (Reload des Add-ons)
+        bpy.app.translations.unregister(__name__)
+        bpy.app.translations.register(__name__, blender_translations())
+    bpy.app.handlers.depsgraph_update_post.append(_estimate_depsgraph_handler)
+    bpy.app.handlers.load_post.append(_estimate_load_handler)
+    bpy.app.handlers.save_post.append(_sidecar_save_handler)
+    bpy.app.handlers.undo_post.append(_plate_list_undo_handler)
+    bpy.app.handlers.redo_post.append(_plate_list_undo_handler)
+    request_sheet_estimate(full=True)
 
 def unregister():
+    if _estimate_depsgraph_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_estimate_depsgraph_handler)
+    if _estimate_load_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_estimate_load_handler)
+    if _sidecar_save_handler in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.remove(_sidecar_save_handler)
+    for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        if _plate_list_undo_handler in handlers:
+            handlers.remove(_plate_list_undo_handler)
+    if bpy.app.timers.is_registered(_estimate_timer):
+        bpy.app.timers.unregister(_estimate_timer)
+    stop_nesting_jobs()
+    bpy.app.translations.unregister(__name__)
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     del bpy.types.Scene.plate_settings
+    del bpy.types.Object.cutlist
     del bpy.types.Scene.cutlist_lang
 
 if __name__ == "__main__":